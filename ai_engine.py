@@ -4,16 +4,321 @@ Morgan - AI Analysis Engine
 Handles AI-powered analysis of Slack messages using OpenAI and Anthropic APIs.
 """
 
+import hashlib
 import json
+import logging
 import os
-from typing import Dict, Any, Optional, List
+import random
+import re
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, Callable, Awaitable, AsyncIterator, Literal, TypeVar
 import asyncio
 
 import openai
 import anthropic
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
-from models import SlackMessage, AIAnalysis, WorkType
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:  # Optional: pooled HTTP/1.1 otherwise
+    HTTP2_AVAILABLE = False
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional: stdlib parser is slower but equivalent here
+    json_loads = json.loads
+
+from models import SlackMessage, AIAnalysis, ActivityType, WorkType, estimate_tokens, keyword_scanner
+
+log = logging.getLogger("morgan.ai")
+
+T = TypeVar("T")
+
+ModelTier = Literal["quick", "medium", "deep"]
+
+
+# Static instruction prefixes. They never contain per-message data so that the
+# providers can serve them from their prompt caches on every call after the first.
+CLASSIFICATION_INSTRUCTIONS = """You are an expert at analyzing work communications for priority and action requirements.
+
+Analyze the Slack message given by the user for work priority and action requirements.
+
+Provide analysis as JSON:
+{
+    "action_required": boolean,
+    "urgency_score": 0.0-1.0,
+    "complexity": "simple|medium|complex", 
+    "work_type": "meeting|review|info|decision|support|other",
+    "emotional_tone": "neutral|urgent|frustrated|encouraging",
+    "estimated_time_minutes": integer,
+    "confidence": 0.0-1.0,
+    "reasoning": "brief explanation",
+    "detected_keywords": ["key", "words"]
+}
+"""
+
+PACKED_CLASSIFICATION_INSTRUCTIONS = """You are an expert at analyzing work communications for priority and action requirements.
+
+The user gives you a numbered list of Slack messages. Analyze each one for work priority and action requirements.
+
+Reply with a JSON object holding one analysis per message, in the same order:
+{
+    "items": [
+        {
+            "index": message number as integer,
+            "action_required": boolean,
+            "urgency_score": 0.0-1.0,
+            "complexity": "simple|medium|complex",
+            "work_type": "meeting|review|info|decision|support|other",
+            "emotional_tone": "neutral|urgent|frustrated|encouraging",
+            "estimated_time_minutes": integer,
+            "confidence": 0.0-1.0,
+            "reasoning": "brief explanation",
+            "detected_keywords": ["key", "words"]
+        }
+    ]
+}
+"""
+
+DEEP_ANALYSIS_INSTRUCTIONS = """You are an expert work communication analyst. Perform deep contextual analysis of the Slack message given by the user.
+
+Context Analysis Required:
+1. What is the real intent behind this message?
+2. What level of urgency does this actually represent?
+3. How much cognitive effort will responding require?
+4. What type of work/collaboration is this?
+5. What emotions or tone are conveyed?
+
+Consider:
+- Implicit vs explicit requests
+- Cultural communication patterns
+- Relationship dynamics (based on communication style)
+- Time sensitivity indicators
+- Complexity of required response
+
+Provide detailed analysis as JSON:
+{
+    "action_required": boolean,
+    "urgency_score": 0.0-1.0,
+    "complexity": "simple|medium|complex",
+    "work_type": "meeting|review|info|decision|support|other",
+    "emotional_tone": "neutral|urgent|frustrated|encouraging|casual",
+    "estimated_time_minutes": integer,
+    "confidence": 0.0-1.0,
+    "reasoning": "detailed explanation of analysis",
+    "detected_keywords": ["important", "contextual", "keywords"]
+}
+
+Focus on practical prioritization for a busy professional.
+"""
+
+
+def create_http_client(sdk: Any) -> Any:
+    """HTTP client tuned for many concurrent API calls to a single host
+    
+    Built from the SDK module's own httpx types (`openai` or `anthropic`),
+    since newer SDK releases bundle their own httpx and reject plain clients.
+    """
+    return sdk.DefaultAsyncHttpxClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=sdk.Timeout(60.0, connect=5.0),
+        limits=type(sdk.DEFAULT_CONNECTION_LIMITS)(max_connections=50, max_keepalive_connections=20)
+    )
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether an API error is transient (rate limit, overload, network)"""
+    if isinstance(error, (openai.APIConnectionError, anthropic.APIConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+def _unit_score(value: Any) -> float:
+    """Clamp a model-reported score into 0-1 (the models don't re-check ranges)"""
+    return min(max(float(value), 0.0), 1.0)
+
+
+# USD per 1M (input, output) tokens, matched by model name prefix
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+}
+
+# Tokens of per-message metadata (sender, channel, URL...) around the text in each prompt
+MESSAGE_PROMPT_OVERHEAD_TOKENS = 60
+
+
+class UsageMeter:
+    """Token usage and cost of one model, from the API's reported usage"""
+    
+    def __init__(self, model: str):
+        prefix = max((p for p in MODEL_PRICES if model.startswith(p)), key=len, default=None)
+        self.input_price, self.output_price = MODEL_PRICES.get(prefix, MODEL_PRICES["claude-3-5-sonnet"])
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+    
+    def record(self, input_tokens: int, output_tokens: int, discount: float = 1.0) -> None:
+        """Add one response's usage; `discount` scales its price (0.5 for batches)"""
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += discount * (
+            input_tokens * self.input_price + output_tokens * self.output_price
+        ) / 1_000_000
+
+
+FALLBACK_ACTION_SCANNER = keyword_scanner(
+    ("?", "please", "can you", "could you", "review", "check", "confirm")
+)
+FALLBACK_URGENT_SCANNER = keyword_scanner(("urgent", "asap", "급함"))
+
+
+class _JsonObjectScanner:
+    """Finds the end of the first top-level JSON object in streamed text
+    
+    Keeps a running brace depth (ignoring braces inside strings) so the
+    response can be parsed as soon as the closing brace arrives, even if the
+    model goes on to emit trailing text.
+    """
+    
+    def __init__(self):
+        self._parts: List[str] = []
+        self._offset = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk; return the complete object once it has closed"""
+        self._parts.append(chunk)
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = self._offset + i
+                self._depth += 1
+            elif char == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self._start:self._offset + i + 1]
+        
+        self._offset += len(chunk)
+        return None
+
+
+def _first_json_object(text: str) -> str:
+    """The first JSON object in a complete response, without any trailing text"""
+    return _JsonObjectScanner().feed(text) or text
+
+
+async def _read_json_object(chunks: AsyncIterator[str]) -> str:
+    """Consume a text stream only until its first JSON object is complete"""
+    scanner = _JsonObjectScanner()
+    async for chunk in chunks:
+        json_text = scanner.feed(chunk)
+        if json_text is not None:
+            return json_text
+    return scanner.text
+
+
+class TokenBudgetLimiter:
+    """Preemptive rate limiter for requests/minute, tokens/minute and concurrency
+    
+    Each request reserves its estimated token count in a sliding one-minute
+    window before it is sent, so bursts are smoothed out client-side instead
+    of being rejected with 429s. The reservation is corrected to the actual
+    usage once the response arrives.
+    """
+    
+    def __init__(self, rpm: int, tpm: int, max_concurrent: int = 5):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = 3
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._lock = asyncio.Lock()
+        self._window: deque[list[float]] = deque()  # [timestamp, tokens]
+    
+    async def acquire(self, estimated_tokens: int) -> list[float]:
+        """Wait for a concurrency slot and room in the RPM/TPM budget"""
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    while self._window and now - self._window[0][0] >= 60:
+                        self._window.popleft()
+                    
+                    used_tokens = sum(tokens for _, tokens in self._window)
+                    if not self._window or (
+                        len(self._window) < self.rpm and used_tokens + estimated_tokens <= self.tpm
+                    ):
+                        reservation = [now, float(estimated_tokens)]
+                        self._window.append(reservation)
+                        return reservation
+                    
+                    # Wait until the oldest reservation leaves the window
+                    await asyncio.sleep(60 - (now - self._window[0][0]))
+        except BaseException:
+            self._semaphore.release()
+            raise
+    
+    @classmethod
+    def from_env(cls, prefix: str, default_rpm: int, default_tpm: int,
+                 max_concurrent: int = 5) -> "TokenBudgetLimiter":
+        """Create a limiter from <PREFIX>_RPM / _TPM / _MAX_CONCURRENT environment variables"""
+        return cls(
+            rpm=int(os.getenv(f"{prefix}_RPM", str(default_rpm))),
+            tpm=int(os.getenv(f"{prefix}_TPM", str(default_tpm))),
+            max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENT", str(max_concurrent)))
+        )
+    
+    def record(self, reservation: list[float], actual_tokens: int) -> None:
+        """Replace a reservation's estimate with the tokens actually used"""
+        reservation[1] = float(actual_tokens)
+    
+    def release(self) -> None:
+        """Free the concurrency slot taken by `acquire`"""
+        self._semaphore.release()
+    
+    async def run(self, estimated_tokens: int, request: Callable[[], Awaitable[T]],
+                  count_tokens: Callable[[T], int]) -> T:
+        """Run an API request within budget, retrying transient errors with backoff"""
+        delay = 1.0
+        attempt = 0
+        while True:
+            reservation = await self.acquire(estimated_tokens)
+            try:
+                response = await request()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+            else:
+                self.record(reservation, count_tokens(response))
+                return response
+            finally:
+                self.release()
+            
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            delay *= 2
+            attempt += 1
 
 
 class AIModelRouter:
@@ -25,115 +330,231 @@ class AIModelRouter:
             "project", "budget", "deadline", "meeting", "review",
             "approval", "decision", "strategy", "planning"
         ]
+        
+        # Shared across router instances
+        self._indicator_scanner = keyword_scanner(tuple(self.complex_indicators))
+        
+        # Messages that never need an AI model
+        self._ack_re = re.compile(
+            r"^(ok(ay)?|thanks?|thank you|thx|ty|lgtm|got it|noted|넵|네|감사합니다|👍|✅|🙏|\+1)[.!]*$",
+            re.IGNORECASE
+        )
+        self._emoji_only_re = re.compile(r"^(:[\w+\-]+:\s*)+$")
+        self._membership_re = re.compile(r"^<@\w+> has (joined|left) the channel$")
+    
+    def try_trivial_classify(self, message: SlackMessage) -> Optional[AIAnalysis]:
+        """Classify obviously non-actionable messages without calling an AI model"""
+        text = message.text.strip()
+        
+        if message.is_bot and not message.mentions_me:
+            reason = "bot notification"
+        elif self._membership_re.match(text):
+            reason = "channel join/leave"
+        elif self._ack_re.match(text) or self._emoji_only_re.match(text):
+            reason = "acknowledgement or reaction"
+        elif len(text) < 3 and "?" not in text:  # "asap"/"help"/"급해요" still go to a model
+            reason = "very short message"
+        else:
+            return None
+        
+        return AIAnalysis(
+            action_required=False,
+            urgency_score=0.1,
+            complexity="simple",
+            work_type=WorkType.INFO,
+            emotional_tone="neutral",
+            estimated_time_minutes=0,
+            confidence=0.9,
+            reasoning=f"Trivial message ({reason})",
+            detected_keywords=[],
+            model_used="trivial-router"
+        )
     
-    def should_use_complex_model(self, message: SlackMessage) -> bool:
-        """Determine if message needs complex AI model"""
-        text = message.text.lower()
+    def route(self, message: SlackMessage) -> ModelTier:
+        """Pick the cheapest model tier that can handle the message
         
-        # Use complex model if:
-        # 1. Message is long
-        if len(message.text) > 200:
-            return True
+        "deep" (Sonnet) is reserved for long messages about complex topics and
+        questions asked in DMs; anything else that needs context goes to
+        "medium" (Haiku), and the rest to "quick" (OpenAI).
+        """
+        has_indicator = self._indicator_scanner.search_lower(message.text_lower)
+        is_dm = message.activity_type is ActivityType.DM
         
-        # 2. Contains complex indicators
-        if any(indicator in text for indicator in self.complex_indicators):
-            return True
+        # Deep analysis if:
+        # 1. Message is very long and about a complex topic
+        if message.token_count > 150 and has_indicator:
+            return "deep"
         
-        # 3. Is from a mention (likely important)
-        if message.mentions_me:
-            return True
+        # 2. Is a question in a DM (personal attention needed)
+        if is_dm and "?" in message.text:
+            return "deep"
         
-        # 4. Is a DM (personal attention needed)
-        if message.activity_type.value == "dm":
-            return True
+        # Medium analysis if long, complex, a mention or a DM
+        if message.token_count > 60 or has_indicator or message.mentions_me or is_dm:
+            return "medium"
         
-        return False
+        return "quick"
 
 
 class OpenAIClient:
     """OpenAI API client for fast, cost-effective analysis"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 limiter: Optional[TokenBudgetLimiter] = None,
+                 http_client: Optional[openai.DefaultAsyncHttpxClient] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key required. Set OPENAI_API_KEY environment variable.")
         
         openai.api_key = self.api_key
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Retries go through the limiter so they respect the rate budget
+        self.client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0, http_client=http_client)
         self.model = os.getenv("DEFAULT_AI_MODEL", "gpt-4o-mini")
+        self.limiter = limiter or TokenBudgetLimiter.from_env("OPENAI", 500, 200_000)
+        
+        # The instruction prefixes are static, so count their tokens once
+        self._instruction_tokens = estimate_tokens(CLASSIFICATION_INSTRUCTIONS, self.model)
+        self._packed_instruction_tokens = estimate_tokens(PACKED_CLASSIFICATION_INSTRUCTIONS, self.model)
+        self.usage = UsageMeter(self.model)
         
     async def quick_classify(self, message: SlackMessage) -> AIAnalysis:
         """Quick classification using GPT-4o-mini"""
         prompt = self._create_classification_prompt(message)
+        estimated_tokens = (
+            self._instruction_tokens + MESSAGE_PROMPT_OVERHEAD_TOKENS + message.token_count + 300
+        )
         
         try:
-            response = self.client.chat.completions.create(
+            content = await self._complete_json(
+                estimated_tokens,
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing work communications for priority and action requirements."},
+                    {"role": "system", "content": CLASSIFICATION_INSTRUCTIONS},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=300,
                 temperature=0.1
             )
-            
-            content = response.choices[0].message.content
-            analysis_data = json.loads(content)
-            
-            return AIAnalysis(
-                action_required=analysis_data.get("action_required", False),
-                urgency_score=analysis_data.get("urgency_score", 0.5),
-                complexity=analysis_data.get("complexity", "simple"),
-                work_type=WorkType(analysis_data.get("work_type", "other")),
-                emotional_tone=analysis_data.get("emotional_tone", "neutral"),
-                estimated_time_minutes=analysis_data.get("estimated_time_minutes", 10),
-                confidence=analysis_data.get("confidence", 0.7),
-                reasoning=analysis_data.get("reasoning", "Quick AI classification"),
-                detected_keywords=analysis_data.get("detected_keywords", []),
-                model_used=self.model
-            )
+            return self._parse_analysis(json_loads(content))
             
         except Exception as e:
             # Fallback analysis
-            print(f"⚠️ OpenAI analysis failed: {e}")
+            log.exception("⚠️ OpenAI analysis failed: %s", e)
             return self._create_fallback_analysis(message, "openai-error")
     
+    async def quick_classify_batch(self, messages: List[SlackMessage],
+                                   pack: int = 10) -> List[tuple[SlackMessage, AIAnalysis]]:
+        """Quick classification of several messages per request
+        
+        Messages are packed `pack` at a time into one prompt, so the fixed
+        per-request overhead is paid once per pack instead of once per message.
+        """
+        packs = [messages[i:i + pack] for i in range(0, len(messages), pack)]
+        results = await asyncio.gather(*(self._classify_pack(chunk) for chunk in packs))
+        return [pair for pack_results in results for pair in pack_results]
+    
+    async def _classify_pack(self, messages: List[SlackMessage]) -> List[tuple[SlackMessage, AIAnalysis]]:
+        """Classify one pack of messages, falling back to single requests"""
+        if len(messages) == 1:
+            return [(messages[0], await self.quick_classify(messages[0]))]
+        
+        prompt = self._create_packed_prompt(messages)
+        max_tokens = 300 * len(messages)
+        estimated_tokens = self._packed_instruction_tokens + max_tokens + sum(
+            MESSAGE_PROMPT_OVERHEAD_TOKENS + message.token_count for message in messages
+        )
+        
+        analyses: Dict[int, AIAnalysis] = {}
+        try:
+            content = await self._complete_json(
+                estimated_tokens,
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": PACKED_CLASSIFICATION_INSTRUCTIONS},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            
+            items = json_loads(content).get("items", [])
+            for position, item in enumerate(items, 1):
+                index = item.get("index", position)
+                if isinstance(index, int) and 1 <= index <= len(messages):
+                    analyses.setdefault(index - 1, self._parse_analysis(item))
+                    
+        except Exception as e:
+            log.exception("⚠️ OpenAI packed analysis failed: %s", e)
+        
+        # Single-message fallback for anything the pack didn't cover
+        missing = [i for i in range(len(messages)) if i not in analyses]
+        if missing:
+            fallbacks = await asyncio.gather(*(self.quick_classify(messages[i]) for i in missing))
+            analyses.update(zip(missing, fallbacks))
+        
+        return [(message, analyses[i]) for i, message in enumerate(messages)]
+    
+    async def _complete_json(self, estimated_tokens: int, **params: Any) -> str:
+        """Stream a chat completion and return its JSON object as soon as it closes"""
+        async def request() -> tuple[str, int]:
+            stream = await self.client.chat.completions.create(stream=True, **params)
+            try:
+                content = await _read_json_object(
+                    chunk.choices[0].delta.content or ""
+                    async for chunk in stream if chunk.choices
+                )
+            finally:
+                await stream.close()
+            
+            # Usage isn't reported for a stream cut short, so estimate it
+            input_tokens = estimated_tokens - params["max_tokens"]
+            output_tokens = estimate_tokens(content, self.model)
+            self.usage.record(input_tokens, output_tokens)
+            return content, input_tokens + output_tokens
+        
+        content, _ = await self.limiter.run(estimated_tokens, request, lambda result: result[1])
+        return content
+    
+    def _parse_analysis(self, analysis_data: Dict[str, Any]) -> AIAnalysis:
+        """Build an AIAnalysis from a parsed JSON classification"""
+        return AIAnalysis(
+            action_required=analysis_data.get("action_required", False),
+            urgency_score=_unit_score(analysis_data.get("urgency_score", 0.5)),
+            complexity=analysis_data.get("complexity", "simple"),
+            work_type=WorkType(analysis_data.get("work_type", "other")),
+            emotional_tone=analysis_data.get("emotional_tone", "neutral"),
+            estimated_time_minutes=analysis_data.get("estimated_time_minutes", 10),
+            confidence=_unit_score(analysis_data.get("confidence", 0.7)),
+            reasoning=analysis_data.get("reasoning", "Quick AI classification"),
+            detected_keywords=analysis_data.get("detected_keywords", []),
+            model_used=self.model
+        )
+    
     def _create_classification_prompt(self, message: SlackMessage) -> str:
-        """Create prompt for quick classification"""
-        return f"""
-Analyze this Slack message for work priority and action requirements:
-
-Message: "{message.text}"
+        """Create the per-message part of the classification prompt"""
+        return f"""Message: "{message.text}"
 From: {message.username}
 Channel: {message.channel_name}
 Type: {message.activity_type}
 Mentions me: {message.mentions_me}
-
-Provide analysis as JSON:
-{{
-    "action_required": boolean,
-    "urgency_score": 0.0-1.0,
-    "complexity": "simple|medium|complex", 
-    "work_type": "meeting|review|info|decision|support|other",
-    "emotional_tone": "neutral|urgent|frustrated|encouraging",
-    "estimated_time_minutes": integer,
-    "confidence": 0.0-1.0,
-    "reasoning": "brief explanation",
-    "detected_keywords": ["key", "words"]
-}}
 """
     
+    def _create_packed_prompt(self, messages: List[SlackMessage]) -> str:
+        """Create the numbered message list for a packed classification"""
+        lines = [f"Analyze the following {len(messages)} messages:"]
+        for i, message in enumerate(messages, 1):
+            lines.append("")
+            lines.append(f"{i}) " + self._create_classification_prompt(message).rstrip())
+        return "\n".join(lines)
+    
     def _create_fallback_analysis(self, message: SlackMessage, error_type: str) -> AIAnalysis:
         """Create fallback analysis when AI fails"""
         # Basic heuristic analysis
-        text_lower = message.text.lower()
-        
-        action_required = any(word in text_lower for word in [
-            "?", "please", "can you", "could you", "review", "check", "confirm"
-        ])
+        action_required = FALLBACK_ACTION_SCANNER.search_lower(message.text_lower)
         
         urgency_score = 0.7 if message.mentions_me else 0.3
-        if any(word in text_lower for word in ["urgent", "asap", "급함"]):
+        if FALLBACK_URGENT_SCANNER.search_lower(message.text_lower):
             urgency_score = 0.9
         
         return AIAnalysis(
@@ -153,163 +574,445 @@ Provide analysis as JSON:
 class ClaudeClient:
     """Anthropic Claude client for deep contextual analysis"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 limiter: Optional[TokenBudgetLimiter] = None,
+                 openai_fallback: Optional[OpenAIClient] = None,
+                 model: Optional[str] = None,
+                 http_client: Optional[anthropic.DefaultAsyncHttpxClient] = None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("Anthropic API key required. Set ANTHROPIC_API_KEY environment variable.")
         
-        self.client = Anthropic(api_key=self.api_key)
-        self.model = os.getenv("COMPLEX_AI_MODEL", "claude-3-5-sonnet-20241022")
+        # Retries go through the limiter so they respect the rate budget
+        self.client = AsyncAnthropic(api_key=self.api_key, max_retries=0, http_client=http_client)
+        self.model = model or os.getenv("COMPLEX_AI_MODEL", "claude-3-5-sonnet-20241022")
+        self.limiter = limiter or TokenBudgetLimiter.from_env("ANTHROPIC", 50, 40_000)
+        self._instruction_tokens = estimate_tokens(DEEP_ANALYSIS_INSTRUCTIONS)
+        self.usage = UsageMeter(self.model)
+        
+        # Shared OpenAI client for failures, so the fallback reuses its connection pool
+        self.openai_fallback = openai_fallback
+        
+        # Cacheable system prefix, shared byte-for-byte by every request
+        self._system_prefix = [
+            {"type": "text", "text": DEEP_ANALYSIS_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+        ]
+        
+        # Message Batches polling (seconds)
+        self.batch_poll_initial = 1.0
+        self.batch_poll_max = 30.0
+        self.batch_timeout = float(os.getenv("CLAUDE_BATCH_TIMEOUT", "300"))
+        # How long a canceled batch may take to end before its results are given up
+        self.batch_cancel_timeout = 60.0
     
     async def deep_analyze(self, message: SlackMessage) -> AIAnalysis:
         """Deep contextual analysis using Claude"""
-        prompt = self._create_deep_analysis_prompt(message)
+        params = self._create_request_params(message)
+        estimated_tokens = (
+            self._instruction_tokens
+            + MESSAGE_PROMPT_OVERHEAD_TOKENS
+            + message.token_count
+            + params["max_tokens"]
+        )
+        
+        async def request() -> tuple[str, int]:
+            async with self.client.messages.stream(**params) as stream:
+                content = await _read_json_object(stream.text_stream)
+                snapshot = stream.current_message_snapshot
+            usage = snapshot.usage
+            # A stream closed at the JSON's last brace never gets its final
+            # message_delta, so output_tokens is still the message_start
+            # placeholder; estimate it like the OpenAI path does
+            if snapshot.stop_reason is None:
+                output_tokens = estimate_tokens(content, self.model)
+            else:
+                output_tokens = usage.output_tokens
+            self._record_usage(usage, output_tokens=output_tokens)
+            return content, usage.input_tokens + output_tokens
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=500,
-                temperature=0.1,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            content, _ = await self.limiter.run(estimated_tokens, request, lambda result: result[1])
+            return self._parse_analysis(content)
             
-            content = response.content[0].text
-            analysis_data = json.loads(content)
+        except Exception as e:
+            log.exception("⚠️ Claude analysis failed: %s", e)
+            # Use OpenAI as fallback
+            if self.openai_fallback is None:
+                self.openai_fallback = OpenAIClient()
+            return await self.openai_fallback.quick_classify(message)
+    
+    async def deep_analyze_batch(self, messages: List[SlackMessage]) -> List[tuple[SlackMessage, AIAnalysis]]:
+        """Deep analysis of many messages through the Message Batches API
+        
+        Batched requests are billed at half price but complete asynchronously,
+        so this is only meant for callers that can tolerate the extra latency.
+        Messages without a successful batch result fall back to `deep_analyze`.
+        """
+        if not messages:
+            return []
+        
+        # custom_id must match ^[a-zA-Z0-9_-]{1,64}$, which Slack timestamps don't
+        by_custom_id = {f"msg-{i}": message for i, message in enumerate(messages)}
+        analyses: Dict[str, AIAnalysis] = {}
+        
+        try:
+            batch = await self.client.messages.batches.create(requests=[
+                {"custom_id": custom_id, "params": self._create_request_params(message)}
+                for custom_id, message in by_custom_id.items()
+            ])
+            log.info("📦 Submitted Claude batch %s (%d messages)", batch.id, len(messages))
             
-            return AIAnalysis(
-                action_required=analysis_data.get("action_required", False),
-                urgency_score=analysis_data.get("urgency_score", 0.5),
-                complexity=analysis_data.get("complexity", "medium"),
-                work_type=WorkType(analysis_data.get("work_type", "other")),
-                emotional_tone=analysis_data.get("emotional_tone", "neutral"),
-                estimated_time_minutes=analysis_data.get("estimated_time_minutes", 20),
-                confidence=analysis_data.get("confidence", 0.8),
-                reasoning=analysis_data.get("reasoning", "Deep Claude analysis"),
-                detected_keywords=analysis_data.get("detected_keywords", []),
-                model_used=self.model
-            )
+            ended = await self._wait_for_batch(batch.id, self.batch_timeout)
+            if not ended:
+                # Requests already finished are billed either way, so collect
+                # them once the cancellation has ended the batch
+                log.warning("⚠️ Claude batch %s timed out, canceling", batch.id)
+                await self.client.messages.batches.cancel(batch.id)
+                ended = await self._wait_for_batch(batch.id, self.batch_cancel_timeout)
             
+            if ended:
+                async for entry in await self.client.messages.batches.results(batch.id):
+                    if entry.custom_id not in by_custom_id or entry.result.type != "succeeded":
+                        continue
+                    self._record_usage(entry.result.message.usage, discount=0.5)
+                    try:
+                        analyses[entry.custom_id] = self._parse_analysis(
+                            _first_json_object(entry.result.message.content[0].text)
+                        )
+                    except Exception as e:
+                        log.warning("⚠️ Claude batch result %s unusable: %s", entry.custom_id, e)
+                
         except Exception as e:
-            print(f"⚠️ Claude analysis failed: {e}")
-            # Use OpenAI as fallback
-            openai_client = OpenAIClient()
-            return await openai_client.quick_classify(message)
+            log.exception("⚠️ Claude batch analysis failed: %s", e)
+        
+        # Inline fallback for anything the batch didn't deliver
+        missing = [custom_id for custom_id in by_custom_id if custom_id not in analyses]
+        if missing:
+            fallbacks = await asyncio.gather(
+                *(self.deep_analyze(by_custom_id[custom_id]) for custom_id in missing)
+            )
+            analyses.update(zip(missing, fallbacks))
+        
+        return [(message, analyses[custom_id]) for custom_id, message in by_custom_id.items()]
+    
+    async def _wait_for_batch(self, batch_id: str, timeout: float) -> bool:
+        """Poll a message batch with exponential backoff until it has ended"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = self.batch_poll_initial
+        
+        while True:
+            batch = await self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return True
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.batch_poll_max)
+    
+    def _record_usage(self, usage: Any, discount: float = 1.0,
+                      output_tokens: Optional[int] = None) -> None:
+        """Meter a Messages API usage block; cache reads bill at a tenth of input
+        
+        `output_tokens` overrides the block's count when it isn't final.
+        """
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        input_tokens = usage.input_tokens + cache_write + round(cache_read * 0.1)
+        if output_tokens is None:
+            output_tokens = usage.output_tokens
+        self.usage.record(input_tokens, output_tokens, discount)
+    
+    def _create_request_params(self, message: SlackMessage) -> Dict[str, Any]:
+        """Create Messages API parameters for deep analysis"""
+        return {
+            "model": self.model,
+            "max_tokens": 500,
+            "temperature": 0.1,
+            "system": self._system_prefix,
+            "messages": [
+                {"role": "user", "content": self._create_deep_analysis_prompt(message)}
+            ]
+        }
+    
+    def _parse_analysis(self, content: str) -> AIAnalysis:
+        """Parse Claude's JSON response into an AIAnalysis"""
+        analysis_data = json_loads(content)
+        
+        return AIAnalysis(
+            action_required=analysis_data.get("action_required", False),
+            urgency_score=_unit_score(analysis_data.get("urgency_score", 0.5)),
+            complexity=analysis_data.get("complexity", "medium"),
+            work_type=WorkType(analysis_data.get("work_type", "other")),
+            emotional_tone=analysis_data.get("emotional_tone", "neutral"),
+            estimated_time_minutes=analysis_data.get("estimated_time_minutes", 20),
+            confidence=_unit_score(analysis_data.get("confidence", 0.8)),
+            reasoning=analysis_data.get("reasoning", "Deep Claude analysis"),
+            detected_keywords=analysis_data.get("detected_keywords", []),
+            model_used=self.model
+        )
     
     def _create_deep_analysis_prompt(self, message: SlackMessage) -> str:
-        """Create prompt for deep contextual analysis"""
-        return f"""
-You are an expert work communication analyst. Perform deep contextual analysis of this Slack message:
-
-Message: "{message.text}"
+        """Create the per-message part of the deep analysis prompt"""
+        return f"""Message: "{message.text}"
 From: {message.username}
 Channel: {message.channel_name} ({message.activity_type})
 Timestamp: {message.timestamp}
 Mentions me directly: {message.mentions_me}
 Message URL: {message.permalink}
-
-Context Analysis Required:
-1. What is the real intent behind this message?
-2. What level of urgency does this actually represent?
-3. How much cognitive effort will responding require?
-4. What type of work/collaboration is this?
-5. What emotions or tone are conveyed?
-
-Consider:
-- Implicit vs explicit requests
-- Cultural communication patterns
-- Relationship dynamics (based on communication style)
-- Time sensitivity indicators
-- Complexity of required response
-
-Provide detailed analysis as JSON:
-{{
-    "action_required": boolean,
-    "urgency_score": 0.0-1.0,
-    "complexity": "simple|medium|complex",
-    "work_type": "meeting|review|info|decision|support|other",
-    "emotional_tone": "neutral|urgent|frustrated|encouraging|casual",
-    "estimated_time_minutes": integer,
-    "confidence": 0.0-1.0,
-    "reasoning": "detailed explanation of analysis",
-    "detected_keywords": ["important", "contextual", "keywords"]
-}}
-
-Focus on practical prioritization for a busy professional.
 """
 
 
 class AIEngine:
     """Main AI engine that coordinates different models"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent: int = 10):
         self.router = AIModelRouter()
-        self.openai_client = OpenAIClient()
-        self.claude_client = ClaudeClient()
+        
+        # Per-provider rate limiting replaces a bare semaphore on concurrency
+        self.openai_limiter = TokenBudgetLimiter.from_env("OPENAI", 500, 200_000, max_concurrent)
+        self.claude_limiter = TokenBudgetLimiter.from_env("ANTHROPIC", 50, 40_000, max_concurrent)
+        
+        # One tuned connection pool per API host, shared by every client of that host
+        self._http_openai = create_http_client(openai)
+        self._http_anthropic = create_http_client(anthropic)
+        
+        self.openai_client = OpenAIClient(limiter=self.openai_limiter, http_client=self._http_openai)
+        self.claude_client = ClaudeClient(
+            limiter=self.claude_limiter, openai_fallback=self.openai_client,
+            http_client=self._http_anthropic
+        )
+        self.haiku_client = ClaudeClient(
+            limiter=self.claude_limiter, openai_fallback=self.openai_client,
+            model=os.getenv("MEDIUM_AI_MODEL", "claude-3-5-haiku-20241022"),
+            http_client=self._http_anthropic
+        )
         
         # Usage tracking for cost optimization
         self.usage_stats = {
             "openai_calls": 0,
+            "haiku_calls": 0,
             "claude_calls": 0,
-            "total_tokens": 0
+            "haiku_batch_calls": 0,
+            "claude_batch_calls": 0,
+            "cache_hits": 0,
+            "trivial_skips": 0
         }
+        
+        # Analyses keyed by message content, so repeated messages skip the API
+        self._cache: Dict[str, tuple[float, AIAnalysis]] = {}
+        self.cache_ttl = float(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+        
+        # Seconds before a single request in analyze_batch falls back to heuristics
+        self.request_timeout = 30.0
+    
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """Open a connection to each API host ahead of the first analysis
+        
+        Each pool gets a bare HEAD request, so DNS, TLS and HTTP/2 setup are
+        done while other work (e.g. the Slack fetch) is still running.
+        Failures are ignored; the real requests will simply connect cold.
+        """
+        async def touch(http_client: Any, base_url: Any) -> None:
+            try:
+                await asyncio.wait_for(http_client.head(str(base_url)), timeout)
+            except Exception as e:
+                log.debug("Connection warmup to %s failed: %s", base_url, e)
+        
+        await asyncio.gather(
+            touch(self._http_openai, self.openai_client.client.base_url),
+            touch(self._http_anthropic, self.claude_client.client.base_url)
+        )
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP connections"""
+        await self._http_openai.aclose()
+        await self._http_anthropic.aclose()
     
     async def analyze_message(self, message: SlackMessage) -> AIAnalysis:
         """Analyze a single message using the appropriate AI model"""
+        trivial = self.router.try_trivial_classify(message)
+        if trivial is not None:
+            self.usage_stats["trivial_skips"] += 1
+            return trivial
+        
+        key = self._cache_key(message)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
         
         # Route to appropriate model
-        if self.router.should_use_complex_model(message):
+        tier = self.router.route(message)
+        if tier == "deep":
             self.usage_stats["claude_calls"] += 1
-            print(f"🧠 Using Claude for complex analysis: {message.text[:50]}...")
-            return await self.claude_client.deep_analyze(message)
+            log.debug("🧠 Using Claude for complex analysis: %s...", message.text[:50])
+            analysis = await self.claude_client.deep_analyze(message)
+        elif tier == "medium":
+            self.usage_stats["haiku_calls"] += 1
+            log.debug("🔍 Using Claude Haiku for contextual analysis: %s...", message.text[:40])
+            analysis = await self.haiku_client.deep_analyze(message)
         else:
             self.usage_stats["openai_calls"] += 1
-            print(f"⚡ Using OpenAI for quick analysis: {message.text[:30]}...")
-            return await self.openai_client.quick_classify(message)
+            log.debug("⚡ Using OpenAI for quick analysis: %s...", message.text[:30])
+            analysis = await self.openai_client.quick_classify(message)
+        
+        self._store(key, analysis)
+        return analysis
+    
+    @staticmethod
+    def _cache_key(message: SlackMessage) -> str:
+        """Content hash of everything the analysis depends on"""
+        raw = f"{message.text}|{message.mentions_me}|{message.activity_type}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def _get_cached(self, key: str) -> Optional[AIAnalysis]:
+        """Get a cached analysis that is still within the TTL"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        stored_at, analysis = entry
+        if time.time() - stored_at >= self.cache_ttl:
+            del self._cache[key]
+            return None
+        
+        self.usage_stats["cache_hits"] += 1
+        return analysis
+    
+    def _store(self, key: str, analysis: AIAnalysis) -> None:
+        """Cache an analysis, skipping heuristic fallbacks from failed calls"""
+        if analysis.model_used != "fallback-heuristic":
+            self._cache[key] = (time.time(), analysis)
     
     async def analyze_batch(self, messages: List[SlackMessage], 
-                          max_concurrent: int = 5) -> List[tuple[SlackMessage, AIAnalysis]]:
-        """Analyze multiple messages with concurrency control"""
-        print(f"🤖 Starting AI analysis of {len(messages)} messages...")
-        
-        # Create semaphore to limit concurrent API calls
-        semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def analyze_with_semaphore(message: SlackMessage) -> tuple[SlackMessage, AIAnalysis]:
-            async with semaphore:
-                analysis = await self.analyze_message(message)
-                return message, analysis
-        
-        # Run analysis with concurrency control
-        tasks = [analyze_with_semaphore(msg) for msg in messages]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filter out exceptions and return successful results
-        successful_results = []
-        for result in results:
-            if isinstance(result, tuple):
-                successful_results.append(result)
+                          use_claude_batch: bool = False,
+                          pack_size: int = 10) -> AsyncIterator[tuple[SlackMessage, AIAnalysis]]:
+        """Analyze multiple messages, yielding each result as soon as it is ready
+        
+        Quick messages are classified `pack_size` per OpenAI request. With
+        `use_claude_batch`, messages routed to each Claude tier are submitted
+        as a single Message Batch instead of one request each (half price, but
+        results can take minutes, so it is off for interactive runs). Requests that
+        exceed `request_timeout` yield heuristic fallback analyses instead of
+        holding up the rest of the batch.
+        """
+        log.info("🤖 Starting AI analysis of %d messages...", len(messages))
+        
+        # Serve repeats from the cache and send each distinct message only once
+        by_key: Dict[str, List[SlackMessage]] = {}
+        for msg in messages:
+            by_key.setdefault(self._cache_key(msg), []).append(msg)
+        
+        ready: List[tuple[SlackMessage, AIAnalysis]] = []
+        pending: List[SlackMessage] = []
+        for key, duplicates in by_key.items():
+            msg = duplicates[0]
+            analysis = self.router.try_trivial_classify(msg)
+            if analysis is not None:
+                self.usage_stats["trivial_skips"] += 1
+            else:
+                analysis = self._get_cached(key)
+            if analysis is not None:
+                ready.extend((duplicate, analysis) for duplicate in duplicates)
             else:
-                print(f"⚠️ Analysis failed: {result}")
+                pending.append(msg)
+        
+        routed: Dict[ModelTier, List[SlackMessage]] = {"quick": [], "medium": [], "deep": []}
+        for msg in pending:
+            routed[self.router.route(msg)].append(msg)
+        quick_messages = routed["quick"]
+        
+        # Concurrency and RPM/TPM budgets are enforced by the clients' limiters
+        async def analyze_quick_pack(pack: List[SlackMessage]) -> List[tuple[SlackMessage, AIAnalysis]]:
+            self.usage_stats["openai_calls"] += len(pack)
+            log.debug("⚡ Using OpenAI for quick analysis of %d messages", len(pack))
+            return await self.openai_client.quick_classify_batch(pack, pack=pack_size)
+        
+        async def analyze_single(message: SlackMessage) -> List[tuple[SlackMessage, AIAnalysis]]:
+            analysis = await self.analyze_message(message)
+            return [(message, analysis)]
+        
+        async def analyze_claude_batch(tier: ModelTier,
+                                       batch: List[SlackMessage]) -> List[tuple[SlackMessage, AIAnalysis]]:
+            name, client = ("claude", self.claude_client) if tier == "deep" else ("haiku", self.haiku_client)
+            self.usage_stats[f"{name}_calls"] += len(batch)
+            self.usage_stats[f"{name}_batch_calls"] += len(batch)
+            log.debug("🧠 Using %s batch for %d %s messages", client.model, len(batch), tier)
+            return await client.deep_analyze_batch(batch)
+        
+        async def guarded(request: Awaitable[List[tuple[SlackMessage, AIAnalysis]]],
+                          batch: List[SlackMessage],
+                          timeout: Optional[float]) -> List[tuple[SlackMessage, AIAnalysis]]:
+            try:
+                return await asyncio.wait_for(request, timeout)
+            except asyncio.TimeoutError:
+                log.warning("⚠️ Analysis timed out for %d messages, using fallback", len(batch))
+                return [
+                    (msg, self.openai_client._create_fallback_analysis(msg, "timeout"))
+                    for msg in batch
+                ]
+            except Exception as e:
+                log.exception("⚠️ Analysis failed for %d messages, using fallback: %s", len(batch), e)
+                return [
+                    (msg, self.openai_client._create_fallback_analysis(msg, "error"))
+                    for msg in batch
+                ]
+        
+        # Message Batches are bounded by the client's own batch_timeout instead
+        requests = [
+            guarded(analyze_quick_pack(pack), pack, self.request_timeout)
+            for pack in (quick_messages[i:i + pack_size] for i in range(0, len(quick_messages), pack_size))
+        ]
+        for tier in ("medium", "deep"):
+            if use_claude_batch and routed[tier]:
+                requests.append(guarded(analyze_claude_batch(tier, routed[tier]), routed[tier], None))
+            else:
+                requests.extend(guarded(analyze_single(msg), [msg], self.request_timeout) for msg in routed[tier])
+        tasks = [asyncio.ensure_future(request) for request in requests]
+        
+        successful = 0
+        try:
+            for message, analysis in ready:
+                successful += 1
+                yield message, analysis
+            
+            for next_done in asyncio.as_completed(tasks):
+                for message, analysis in await next_done:
+                    key = self._cache_key(message)
+                    self._store(key, analysis)
+                    for duplicate in by_key[key]:
+                        successful += 1
+                        yield duplicate, analysis
+        finally:
+            # The consumer may stop early; don't leave requests running
+            for task in tasks:
+                task.cancel()
         
-        print(f"✅ AI analysis complete: {len(successful_results)} successful")
-        return successful_results
+        log.info("✅ AI analysis complete: %d successful", successful)
     
     def get_usage_stats(self) -> Dict[str, Any]:
         """Get usage statistics"""
-        total_calls = self.usage_stats["openai_calls"] + self.usage_stats["claude_calls"]
+        stats = self.usage_stats
+        total_calls = stats["openai_calls"] + stats["haiku_calls"] + stats["claude_calls"]
         
-        # Rough cost estimation (approximate)
-        openai_cost = self.usage_stats["openai_calls"] * 0.001  # $0.001 per call (rough)
-        claude_cost = self.usage_stats["claude_calls"] * 0.01   # $0.01 per call (rough)
+        # Cost from metered tokens at each model's price (batches already discounted)
+        meters = [self.openai_client.usage, self.haiku_client.usage, self.claude_client.usage]
+        input_tokens = sum(meter.input_tokens for meter in meters)
+        output_tokens = sum(meter.output_tokens for meter in meters)
         
         return {
-            **self.usage_stats,
+            **stats,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
             "total_calls": total_calls,
-            "estimated_cost_usd": round(openai_cost + claude_cost, 3),
-            "openai_percentage": round(self.usage_stats["openai_calls"] / max(total_calls, 1) * 100, 1),
-            "claude_percentage": round(self.usage_stats["claude_calls"] / max(total_calls, 1) * 100, 1)
+            "estimated_cost_usd": round(sum(meter.cost_usd for meter in meters), 4),
+            "openai_percentage": round(stats["openai_calls"] / max(total_calls, 1) * 100, 1),
+            "haiku_percentage": round(stats["haiku_calls"] / max(total_calls, 1) * 100, 1),
+            "claude_percentage": round(stats["claude_calls"] / max(total_calls, 1) * 100, 1)
         }
 
 
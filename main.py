@@ -5,14 +5,22 @@ Beautiful command-line interface for the Morgan Slack activity manager.
 """
 
 import asyncio
+import atexit
+import copy
+import logging
 import os
+import queue
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
 import typer
 from rich.console import Console
+from rich.logging import RichHandler
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Confirm, IntPrompt
@@ -33,6 +41,82 @@ console = Console()
 # Global orchestrator instance
 morgan: Optional[MorganOrchestrator] = None
 
+# Most recent analysis result, reused by commands that only look items up
+LAST_RUN_PATH = Path.home() / ".morgan" / "last_run.json"
+
+# Full debug log, including stack traces kept off the console
+LOG_PATH = Path.home() / ".morgan" / "morgan.log"
+
+# Per-priority styling, built once and copied per table row
+PRIORITY_COLORS = {
+    Priority.URGENT: "red",
+    Priority.HIGH: "orange3",
+    Priority.MEDIUM: "yellow",
+    Priority.LOW: "green"
+}
+
+PRIORITY_ICONS = {
+    Priority.URGENT: "🔥",
+    Priority.HIGH: "⚡",
+    Priority.MEDIUM: "📌",
+    Priority.LOW: "📝"
+}
+
+PRIORITY_LABELS = {
+    priority: Text(f"{PRIORITY_ICONS[priority]} {priority.value.upper()}", style=PRIORITY_COLORS[priority])
+    for priority in Priority
+}
+
+
+def _without_traceback(record: logging.LogRecord) -> logging.LogRecord:
+    """Console filter: keep the message, leave the traceback to the log file"""
+    if record.exc_info:
+        record = copy.copy(record)
+        record.exc_info = None
+        record.exc_text = None
+    return record
+
+
+class _LocalQueueHandler(QueueHandler):
+    """Queue records as they are; the listener formats them in-process
+    
+    The stock prepare() formats early and folds the traceback into the
+    message, which would bypass the console's traceback filter.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging() -> None:
+    """Send logs to the Rich console (LOG_LEVEL) and to the log file
+    
+    Records are handed to a background listener, so console and file writes
+    never block the asyncio loop.
+    """
+    console_handler = RichHandler(console=console, show_path=False)
+    console_handler.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    console_handler.addFilter(_without_traceback)
+    handlers: list[logging.Handler] = [console_handler]
+    
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(LOG_PATH, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        handlers.append(file_handler)
+    except OSError:
+        pass
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s", handlers=[_LocalQueueHandler(log_queue)])
+    # Only Morgan's own debug output; keep HTTP client chatter at its usual level
+    for noisy in ("httpx", "httpcore", "openai", "anthropic", "slack_sdk", "urllib3"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
 
 def get_morgan() -> MorganOrchestrator:
     """Get or create Morgan orchestrator instance"""
@@ -42,12 +126,33 @@ def get_morgan() -> MorganOrchestrator:
     return morgan
 
 
+def save_last_run(todo_list: TodoList) -> None:
+    """Persist the latest todo list for later commands"""
+    try:
+        LAST_RUN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        LAST_RUN_PATH.write_bytes(todo_list.to_json())
+    except OSError as e:
+        console.print(f"⚠️ [yellow]분석 결과를 저장하지 못했습니다: {e}[/yellow]")
+
+
+def load_last_run(max_age_hours: Optional[float] = None) -> Optional[TodoList]:
+    """Load the latest persisted todo list, if any (and newer than `max_age_hours`)"""
+    try:
+        if max_age_hours is not None and time.time() - LAST_RUN_PATH.stat().st_mtime > max_age_hours * 3600:
+            return None
+        return TodoList.model_validate_json(LAST_RUN_PATH.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+REQUIRED_ENV_VARS = ["SLACK_TOKEN", "OPENAI_API_KEY", "ANTHROPIC_API_KEY"]
+
+
 def check_environment() -> bool:
     """Check if required environment variables are set"""
-    required_vars = ["SLACK_TOKEN", "OPENAI_API_KEY", "ANTHROPIC_API_KEY"]
     missing_vars = []
     
-    for var in required_vars:
+    for var in REQUIRED_ENV_VARS:
         if not os.getenv(var):
             missing_vars.append(var)
     
@@ -76,29 +181,9 @@ def display_todo_list(todo_list: TodoList) -> None:
     table.add_column("채널", style="yellow", width=15)
     table.add_column("권장 처리시간", style="magenta", width=20)
     
-    # Group by priority
-    priority_colors = {
-        Priority.URGENT: "red",
-        Priority.HIGH: "orange3",
-        Priority.MEDIUM: "yellow",
-        Priority.LOW: "green"
-    }
-    
-    priority_icons = {
-        Priority.URGENT: "🔥",
-        Priority.HIGH: "⚡",
-        Priority.MEDIUM: "📌",
-        Priority.LOW: "📝"
-    }
-    
     for todo in todo_list.items:
-        priority_text = Text(
-            f"{priority_icons[todo.priority]} {todo.priority.value.upper()}",
-            style=priority_colors[todo.priority]
-        )
-        
         table.add_row(
-            priority_text,
+            PRIORITY_LABELS[todo.priority].copy(),
             todo.title,
             todo.source_message.username,
             f"#{todo.source_message.channel_name}",
@@ -107,13 +192,14 @@ def display_todo_list(todo_list: TodoList) -> None:
     
     console.print(table)
     
-    # Summary stats
+    # Summary stats, counted in a single pass
+    counts = Counter(todo.priority for todo in todo_list.items)
     stats = Panel(
         f"📊 총 {todo_list.total_items}개 할일 | "
-        f"🔥 긴급 {len(todo_list.get_by_priority(Priority.URGENT))}개 | "
-        f"⚡ 높음 {len(todo_list.get_by_priority(Priority.HIGH))}개 | "
-        f"📌 보통 {len(todo_list.get_by_priority(Priority.MEDIUM))}개 | "
-        f"📝 낮음 {len(todo_list.get_by_priority(Priority.LOW))}개",
+        f"🔥 긴급 {counts[Priority.URGENT]}개 | "
+        f"⚡ 높음 {counts[Priority.HIGH]}개 | "
+        f"📌 보통 {counts[Priority.MEDIUM]}개 | "
+        f"📝 낮음 {counts[Priority.LOW]}개",
         title="요약",
         border_style="blue"
     )
@@ -172,7 +258,8 @@ def display_todo_details(todo_list: TodoList, index: int) -> None:
 def analyze(
     hours: int = typer.Option(24, "--hours", "-h", help="분석할 시간 범위 (시간)"),
     max_messages: int = typer.Option(100, "--max", "-m", help="처리할 최대 메시지 수"),
-    save: bool = typer.Option(False, "--save", "-s", help="결과를 파일로 저장")
+    save: bool = typer.Option(False, "--save", "-s", help="결과를 파일로 저장"),
+    claude_batch: bool = typer.Option(False, "--claude-batch", help="Claude 분석을 배치로 요청 (비용 절반, 수 분 지연 가능)")
 ):
     """🔍 슬랙 활동을 분석하고 할일 목록을 생성합니다"""
     
@@ -185,18 +272,32 @@ def analyze(
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
         console=console,
     ) as progress:
         task = progress.add_task("분석 중...", total=None)
         
+        def on_progress(done: int, total: int) -> None:
+            progress.update(task, completed=done, total=total)
+        
         # Run async analysis
         async def run_analysis():
             orchestrator = get_morgan()
-            return await orchestrator.process_slack_activities(hours, max_messages)
+            try:
+                return await orchestrator.process_slack_activities(
+                    hours, max_messages, on_progress, use_claude_batch=claude_batch
+                )
+            finally:
+                await orchestrator.close()
         
         todo_list = asyncio.run(run_analysis())
         progress.update(task, description="완료!")
     
+    # A failed run's placeholder list must not stand in for a real result
+    if get_morgan().last_error is None:
+        save_last_run(todo_list)
+    
     # Display results
     console.print("\n" + "="*60)
     display_todo_list(todo_list)
@@ -225,20 +326,30 @@ def analyze(
 @app.command()
 def details(
     number: int = typer.Argument(..., help="할일 번호"),
-    hours: int = typer.Option(24, "--hours", "-h", help="분석할 시간 범위 (시간)")
+    hours: int = typer.Option(24, "--hours", "-h", help="분석할 시간 범위 (시간)"),
+    max_age: float = typer.Option(24, "--max-age", help="저장된 분석 결과를 재사용할 최대 경과 시간 (시간)")
 ):
     """📖 특정 할일의 상세 정보를 표시합니다"""
     
-    if not check_environment():
-        raise typer.Exit(1)
+    # Use the last analysis result; only re-analyze when it is missing or stale
+    todo_list = load_last_run(max_age)
     
-    # Re-analyze to get current todo list (in real app, this would be cached)
-    async def get_todo_list():
-        orchestrator = get_morgan()
-        return await orchestrator.process_slack_activities(hours, max_messages=50)
-    
-    with console.status("할일 목록을 불러오는 중..."):
-        todo_list = asyncio.run(get_todo_list())
+    if todo_list is None:
+        if not check_environment():
+            raise typer.Exit(1)
+        
+        async def get_todo_list():
+            orchestrator = get_morgan()
+            try:
+                return await orchestrator.process_slack_activities(hours, max_messages=50)
+            finally:
+                await orchestrator.close()
+        
+        with console.status("할일 목록을 불러오는 중..."):
+            todo_list = asyncio.run(get_todo_list())
+        
+        if get_morgan().last_error is None:
+            save_last_run(todo_list)
     
     display_todo_details(todo_list, number)
 
@@ -257,13 +368,19 @@ def feedback(
     
     orchestrator = get_morgan()
     
-    # For demo purposes, create a dummy todo_id
-    todo_id = f"todo_{todo_number}"
+    # Attach feedback to the item shown by the last analysis, if it is still there
+    todo_list = load_last_run()
+    if todo_list is not None and 1 <= todo_number <= len(todo_list.items):
+        todo = todo_list.items[todo_number - 1]
+        todo_id, predicted_priority = todo.id, todo.priority
+    else:
+        todo_id, predicted_priority = f"todo_{todo_number}", Priority.MEDIUM
     
     feedback = orchestrator.collect_feedback(
         todo_id=todo_id,
         satisfaction=satisfaction,
-        feedback_text=comment
+        feedback_text=comment,
+        predicted_priority=predicted_priority
     )
     
     console.print(f"✅ 피드백이 기록되었습니다!")
@@ -334,10 +451,13 @@ def stats():
     table.add_column("값", style="white")
     
     table.add_row("OpenAI 호출", f"{ai_stats['openai_calls']}회")
+    table.add_row("Claude Haiku 호출", f"{ai_stats['haiku_calls']}회")
     table.add_row("Claude 호출", f"{ai_stats['claude_calls']}회")
     table.add_row("총 호출", f"{ai_stats['total_calls']}회")
+    table.add_row("사용 토큰", f"입력 {ai_stats['input_tokens']:,} / 출력 {ai_stats['output_tokens']:,}")
     table.add_row("예상 비용", f"${ai_stats['estimated_cost_usd']}")
     table.add_row("OpenAI 비율", f"{ai_stats['openai_percentage']}%")
+    table.add_row("Claude Haiku 비율", f"{ai_stats['haiku_percentage']}%")
     table.add_row("Claude 비율", f"{ai_stats['claude_percentage']}%")
     
     console.print(table)
@@ -353,7 +473,7 @@ def main():
     
     슬랙 활동을 분석하고 똑똑한 할일 목록을 생성합니다.
     """
-    pass
+    setup_logging()
 
 
 if __name__ == "__main__":
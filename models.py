@@ -6,9 +6,15 @@ Pydantic-based data models for Slack messages, AI analysis, and todo items.
 
 from datetime import datetime
 from enum import StrEnum
-from typing import Optional, List, Dict, Any
+from functools import cached_property, lru_cache
+from typing import List, Dict, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token estimates fall back to a character heuristic
+    tiktoken = None
 
 
 class Priority(StrEnum):
@@ -37,6 +43,74 @@ class WorkType(StrEnum):
     OTHER = "other"         # 기타
 
 
+@lru_cache(maxsize=None)
+def _token_encoding(model: str) -> Any:
+    """Get (and cache) the tiktoken encoding for a model, if available"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encodings are downloaded on first use; stay usable offline
+        return None
+
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    """Estimate the token count of a prompt before sending it"""
+    encoding = _token_encoding(model) if model.startswith("gpt") else None
+    if encoding is None:
+        return len(text) // 4 + 1  # ~4 characters per token
+    return len(encoding.encode(text))
+
+
+class KeywordScanner:
+    """Case-insensitive keyword matcher
+    
+    Lowercases the text once and runs str.__contains__ per keyword. For these
+    short keyword lists that is several times faster than an IGNORECASE regex
+    alternation, which re can't accelerate with a literal-prefix search.
+    
+    Keywords match as substrings, not whole words ("review" matches "reviewed",
+    "bug" would match "debug"). That is intended: it is how the original
+    `in` checks and the regex alternation before this both matched.
+    """
+    __slots__ = ("keywords",)
+    
+    def __init__(self, keywords: tuple[str, ...]):
+        self.keywords = tuple(keyword.lower() for keyword in keywords)
+    
+    def search(self, text: str) -> bool:
+        """Whether any keyword occurs in the text"""
+        return self.search_lower(text.lower())
+    
+    def count(self, text: str) -> int:
+        """How many distinct keywords occur in the text"""
+        return self.count_lower(text.lower())
+    
+    def search_lower(self, text_lower: str) -> bool:
+        """`search` for text that is already lowercased"""
+        return any(map(text_lower.__contains__, self.keywords))
+    
+    def count_lower(self, text_lower: str) -> int:
+        """`count` for text that is already lowercased"""
+        return sum(map(text_lower.__contains__, self.keywords))
+
+
+@lru_cache(maxsize=None)
+def keyword_scanner(keywords: tuple[str, ...]) -> KeywordScanner:
+    """Shared scanner for a keyword set (built once per set)"""
+    return KeywordScanner(keywords)
+
+
+# Shared by all models. Schemas are built on first validation rather than at
+# import, since most CLI commands only ever touch a few of the models.
+# Datetimes use pydantic-core's native ISO-8601 serializer (no Python callback).
+MODEL_CONFIG = ConfigDict(defer_build=True)
+
+
 class SlackMessage(BaseModel):
     """Slack message data model"""
     message_id: str
@@ -50,24 +124,34 @@ class SlackMessage(BaseModel):
     
     # Message context
     activity_type: ActivityType
-    thread_ts: Optional[str] = None
+    thread_ts: str | None = None
     is_bot: bool = False
     mentions_me: bool = False
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.now)
+    token_count: int = Field(default=0, ge=0, description="Estimated tokens in text, computed on creation")
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
+    
+    @model_validator(mode="after")
+    def _estimate_token_count(self) -> "SlackMessage":
+        """Estimate tokens once, so routing, rate limiting and costs agree"""
+        if not self.token_count and self.text:
+            self.token_count = estimate_tokens(self.text, "gpt-4o-mini")
+        return self
+    
+    @cached_property
+    def text_lower(self) -> str:
+        """Lowercased text, computed once for all keyword/pattern checks"""
+        return self.text.lower()
 
 
 class AIAnalysis(BaseModel):
     """AI analysis results for a message"""
     # Analysis results
     action_required: bool
-    urgency_score: float = Field(ge=0, le=1, description="Urgency from 0-1")
+    urgency_score: float = Field(description="Urgency from 0-1")
     complexity: str = Field(description="simple|medium|complex")
     work_type: WorkType
     emotional_tone: str = Field(description="neutral|urgent|frustrated|encouraging")
@@ -76,7 +160,7 @@ class AIAnalysis(BaseModel):
     estimated_time_minutes: int = Field(ge=0, description="Expected time to handle")
     
     # AI metadata
-    confidence: float = Field(ge=0, le=1, description="AI confidence in analysis")
+    confidence: float = Field(description="AI confidence in analysis")
     reasoning: str = Field(description="Brief explanation of the analysis")
     detected_keywords: List[str] = Field(default_factory=list)
     
@@ -84,22 +168,19 @@ class AIAnalysis(BaseModel):
     model_used: str = Field(description="AI model that performed analysis")
     analysis_timestamp: datetime = Field(default_factory=datetime.now)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 class PriorityScore(BaseModel):
     """Priority scoring with detailed breakdown"""
-    final_score: float = Field(ge=0, le=1, description="Final priority score")
+    final_score: float = Field(description="Final priority score")
     priority_level: Priority
     
-    # Score breakdown
-    sender_authority_score: float = Field(ge=0, le=1)
-    time_urgency_score: float = Field(ge=0, le=1)
-    content_importance_score: float = Field(ge=0, le=1)
-    personal_weight_score: float = Field(ge=0, le=1)
+    # Score breakdown (each 0-1)
+    sender_authority_score: float
+    time_urgency_score: float
+    content_importance_score: float
+    personal_weight_score: float
     
     # Recommendations
     recommended_action_time: str = Field(description="When to handle this")
@@ -108,10 +189,7 @@ class PriorityScore(BaseModel):
     # Context
     calculated_at: datetime = Field(default_factory=datetime.now)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 class TodoItem(BaseModel):
@@ -130,25 +208,22 @@ class TodoItem(BaseModel):
     
     # Status
     completed: bool = False
-    completed_at: Optional[datetime] = None
+    completed_at: datetime | None = None
     
     # User interaction
-    user_feedback: Optional[str] = None
-    satisfaction_rating: Optional[int] = Field(None, ge=1, le=5)
+    user_feedback: str | None = None
+    satisfaction_rating: int | None = Field(None, description="1-5, checked by the CLI")
     
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
-    @property
+    @cached_property
     def priority(self) -> Priority:
-        """Get priority level from score"""
+        """Get priority level from score (cached; priority_score isn't reassigned)"""
         return self.priority_score.priority_level
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 class UserPattern(BaseModel):
@@ -162,35 +237,29 @@ class UserPattern(BaseModel):
     last_updated: datetime = Field(default_factory=datetime.now)
     created_at: datetime = Field(default_factory=datetime.now)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 class LearningFeedback(BaseModel):
     """User feedback for learning system"""
     todo_id: str
     predicted_priority: Priority
-    actual_priority: Optional[Priority] = None
-    user_satisfaction: int = Field(ge=1, le=5, description="1=very poor, 5=excellent")
-    feedback_text: Optional[str] = None
+    actual_priority: Priority | None = None
+    user_satisfaction: int = Field(description="1=very poor, 5=excellent (checked by the CLI)")
+    feedback_text: str | None = None
     
     # Context for learning
     context_data: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=datetime.now)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 class TodoList(BaseModel):
     """A collection of todo items with metadata"""
     id: str = Field(description="List identifier")
     title: str = Field(description="List title")
-    description: Optional[str] = None
+    description: str | None = None
     
     # Todos
     items: List[TodoItem] = Field(default_factory=list)
@@ -204,6 +273,9 @@ class TodoList(BaseModel):
     # Generation info
     source_hours_scanned: int = Field(default=24)
     ai_models_used: List[str] = Field(default_factory=list)
+    
+    # Items grouped by priority, built on first lookup and kept current by add_item
+    _by_priority: Dict[Priority, List[TodoItem]] | None = PrivateAttr(default=None)
 
     @property
     def completion_rate(self) -> float:
@@ -213,20 +285,32 @@ class TodoList(BaseModel):
         return self.completed_items / self.total_items
 
     def add_item(self, item: TodoItem) -> None:
-        """Add a todo item to the list"""
+        """Add a todo item to the list
+        
+        Counts are updated incrementally; bulk builds should pass `items` (and
+        the counts) at construction instead of calling this per item.
+        """
         self.items.append(item)
+        if self._by_priority is not None:
+            self._by_priority.setdefault(item.priority, []).append(item)
         self.total_items = len(self.items)
-        self.completed_items = sum(1 for item in self.items if item.completed)
+        if item.completed:
+            self.completed_items += 1
         self.updated_at = datetime.now()
 
+    def to_json(self) -> bytes:
+        """Serialize the whole list to JSON bytes in one pydantic-core pass"""
+        return self.__pydantic_serializer__.to_json(self)
+
     def get_by_priority(self, priority: Priority) -> List[TodoItem]:
         """Get items by priority level"""
-        return [item for item in self.items if item.priority == priority]
+        if self._by_priority is None:
+            self._by_priority = {}
+            for item in self.items:
+                self._by_priority.setdefault(item.priority, []).append(item)
+        return self._by_priority.get(priority, [])
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = MODEL_CONFIG
 
 
 # Example usage and validation
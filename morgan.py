@@ -5,17 +5,136 @@ Central coordination of all components for smart Slack todo management.
 """
 
 import asyncio
+import logging
+import os
 import uuid
+from contextlib import aclosing
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from operator import attrgetter
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable, Iterator, Tuple
 
 from models import (
     SlackMessage, AIAnalysis, PriorityScore, TodoItem, TodoList, 
-    Priority, UserPattern, LearningFeedback
+    Priority, UserPattern, LearningFeedback, keyword_scanner
 )
-from slack_client import SlackClient
-from ai_engine import AIEngine
-from priority_engine import PriorityCalculator
+
+if TYPE_CHECKING:
+    from slack_client import SlackClient
+    from ai_engine import AIEngine
+    from priority_engine import PriorityCalculator
+
+log = logging.getLogger("morgan")
+
+# Todos are built with every field passed, so they share one fields-set
+# (see PRIORITY_SCORE_FIELDS in priority_engine)
+TODO_ITEM_FIELDS = set(TodoItem.model_fields)
+
+# Keyword-based title templates, checked in order after questions
+TITLE_RULES = [
+    (keyword_scanner(("review", "검토")), "검토: {sender} 요청"),
+    (keyword_scanner(("meeting", "회의")), "회의: {sender}와 논의"),
+    (keyword_scanner(("approve", "승인")), "승인: {sender} 요청 건"),
+]
+
+
+# Per-message text builders. They take plain, annotated str/float/int
+# arguments rather than models, so they can be compiled as-is (e.g. Cython
+# pure-Python mode or mypyc) if todo generation ever becomes the bottleneck.
+
+def build_title(text: str, text_lower: str, sender: str, work_type: str) -> str:
+    """Generate concise todo title (`text_lower` is `text` lowercased)"""
+    # Common patterns for todo titles
+    if "?" in text:
+        # Question -> "답변: ..."
+        return f"답변: {sender}의 질문"
+    for scanner, template in TITLE_RULES:
+        if scanner.search_lower(text_lower):
+            return template.format(sender=sender)
+    
+    if work_type == "decision":
+        return f"결정: {sender} 의사결정 필요"
+    elif work_type == "support":
+        return f"지원: {sender} 도움 요청"
+    else:
+        # Generic title
+        return f"처리: {sender}의 메시지"
+
+
+def build_description(text: str, sender: str, channel: str, activity_type: str,
+                      timestamp: datetime, work_type: str, complexity: str, minutes: int,
+                      tone: str, keywords: List[str], reasoning: str, action_time: str) -> str:
+    """Generate detailed todo description"""
+    preview = text[:100]
+    if len(text) > 100:
+        preview += "..."
+    
+    keyword_line = f"\n  - 핵심 키워드: {', '.join(keywords)}" if keywords else ""
+    
+    # One f-string build instead of a list of lines and a join
+    return (
+        # Message preview
+        f"💬 \"{preview}\"\n"
+        "\n"
+        # Context info
+        f"👤 발신자: {sender}\n"
+        f"📍 채널: #{channel} ({activity_type})\n"
+        f"⏰ 시간: {timestamp.isoformat(' ', 'minutes')[:16]}\n"
+        "\n"
+        # AI Analysis
+        "🤖 AI 분석:\n"
+        f"  - 작업 유형: {work_type}\n"
+        f"  - 복잡도: {complexity}\n"
+        f"  - 예상 소요시간: {minutes}분\n"
+        f"  - 감정적 톤: {tone}"
+        f"{keyword_line}\n"
+        "\n"
+        # Priority reasoning
+        f"🎯 우선순위 근거: {reasoning}\n"
+        f"📅 권장 처리시간: {action_time}"
+    )
+
+
+def uuid4_ids(count: int) -> Iterator[str]:
+    """Yield `count` random UUID4 strings drawn from a single os.urandom call"""
+    raw = os.urandom(16 * count)
+    for start in range(0, 16 * count, 16):
+        yield str(uuid.UUID(bytes=raw[start:start + 16], version=4))
+
+
+@lru_cache(maxsize=1024)
+def _label_tags(activity_type: str, work_type: str, channel: str,
+                complexity: str) -> Tuple[str, str, str, str]:
+    """Tag strings for a label combination, shared across messages"""
+    return (f"type:{activity_type}", f"work:{work_type}",
+            f"channel:{channel}", f"complexity:{complexity}")
+
+
+def build_tags(activity_type: str, work_type: str, channel: str,
+               urgency: float, complexity: str, minutes: int) -> List[str]:
+    """Generate relevant tags"""
+    type_tag, work_tag, channel_tag, complexity_tag = _label_tags(
+        activity_type, work_type, channel, complexity
+    )
+    # Activity type, work type and channel tags
+    tags = [type_tag, work_tag, channel_tag]
+    
+    # Urgency tag
+    if urgency > 0.8:
+        tags.append("urgent")
+    elif urgency > 0.6:
+        tags.append("important")
+    
+    # Complexity tag
+    tags.append(complexity_tag)
+    
+    # Time estimate tag
+    if minutes <= 15:
+        tags.append("quick")
+    elif minutes >= 60:
+        tags.append("deep-work")
+    
+    return tags
 
 
 class TodoGenerator:
@@ -25,8 +144,9 @@ class TodoGenerator:
         pass
     
     def generate_todo_item(self, message: SlackMessage, analysis: AIAnalysis, 
-                          priority_score: PriorityScore) -> TodoItem:
-        """Generate a single todo item"""
+                          priority_score: PriorityScore, now: Optional[datetime] = None,
+                          todo_id: Optional[str] = None) -> TodoItem:
+        """Generate a single todo item (timestamped `now`, default: the current time)"""
         
         # Generate title
         title = self._generate_title(message, analysis)
@@ -37,132 +157,98 @@ class TodoGenerator:
         # Generate tags
         tags = self._generate_tags(message, analysis)
         
-        return TodoItem(
-            id=str(uuid.uuid4()),
+        # Every field comes from already-validated models or our own code, so
+        # skip validation; defaults are passed explicitly since model_construct
+        # would otherwise resolve each Field default per item
+        now = now or datetime.now()
+        return TodoItem.model_construct(
+            _fields_set=TODO_ITEM_FIELDS,
+            id=todo_id or str(uuid.uuid4()),
             source_message=message,
             ai_analysis=analysis,
             priority_score=priority_score,
             title=title,
             description=description,
-            tags=tags
+            tags=tags,
+            completed=False,
+            completed_at=None,
+            user_feedback=None,
+            satisfaction_rating=None,
+            created_at=now,
+            updated_at=now
         )
     
     def _generate_title(self, message: SlackMessage, analysis: AIAnalysis) -> str:
         """Generate concise todo title"""
-        sender = message.username
-        
-        # Extract action from message
-        text = message.text.strip()
-        
-        # Common patterns for todo titles
-        if "?" in text:
-            # Question -> "답변: ..."
-            return f"답변: {sender}의 질문"
-        elif any(word in text.lower() for word in ["review", "검토"]):
-            return f"검토: {sender} 요청"
-        elif any(word in text.lower() for word in ["meeting", "회의"]):
-            return f"회의: {sender}와 논의"
-        elif any(word in text.lower() for word in ["approve", "승인"]):
-            return f"승인: {sender} 요청 건"
-        elif analysis.work_type.value == "decision":
-            return f"결정: {sender} 의사결정 필요"
-        elif analysis.work_type.value == "support":
-            return f"지원: {sender} 도움 요청"
-        else:
-            # Generic title
-            return f"처리: {sender}의 메시지"
+        return build_title(
+            message.text, message.text_lower, message.username, analysis.work_type.value
+        )
     
     def _generate_description(self, message: SlackMessage, analysis: AIAnalysis, 
                             priority_score: PriorityScore) -> str:
         """Generate detailed todo description"""
-        lines = []
-        
-        # Message preview
-        preview = message.text[:100] + "..." if len(message.text) > 100 else message.text
-        lines.append(f"💬 \"{preview}\"")
-        lines.append("")
-        
-        # Context info
-        lines.append(f"👤 발신자: {message.username}")
-        lines.append(f"📍 채널: #{message.channel_name} ({message.activity_type})")
-        lines.append(f"⏰ 시간: {message.timestamp.strftime('%Y-%m-%d %H:%M')}")
-        lines.append("")
-        
-        # AI Analysis
-        lines.append(f"🤖 AI 분석:")
-        lines.append(f"  - 작업 유형: {analysis.work_type}")
-        lines.append(f"  - 복잡도: {analysis.complexity}")
-        lines.append(f"  - 예상 소요시간: {analysis.estimated_time_minutes}분")
-        lines.append(f"  - 감정적 톤: {analysis.emotional_tone}")
-        if analysis.detected_keywords:
-            lines.append(f"  - 핵심 키워드: {', '.join(analysis.detected_keywords)}")
-        lines.append("")
-        
-        # Priority reasoning
-        lines.append(f"🎯 우선순위 근거: {priority_score.reasoning}")
-        lines.append(f"📅 권장 처리시간: {priority_score.recommended_action_time}")
-        
-        return "\n".join(lines)
+        return build_description(
+            message.text, message.username, message.channel_name,
+            message.activity_type.value, message.timestamp,
+            analysis.work_type.value, analysis.complexity, analysis.estimated_time_minutes,
+            analysis.emotional_tone, analysis.detected_keywords,
+            priority_score.reasoning, priority_score.recommended_action_time
+        )
     
     def _generate_tags(self, message: SlackMessage, analysis: AIAnalysis) -> List[str]:
         """Generate relevant tags"""
-        tags = []
-        
-        # Activity type tag
-        tags.append(f"type:{message.activity_type}")
-        
-        # Work type tag
-        tags.append(f"work:{analysis.work_type}")
-        
-        # Channel tag
-        tags.append(f"channel:{message.channel_name}")
-        
-        # Urgency tag
-        if analysis.urgency_score > 0.8:
-            tags.append("urgent")
-        elif analysis.urgency_score > 0.6:
-            tags.append("important")
-        
-        # Complexity tag
-        tags.append(f"complexity:{analysis.complexity}")
-        
-        # Time estimate tag
-        if analysis.estimated_time_minutes <= 15:
-            tags.append("quick")
-        elif analysis.estimated_time_minutes >= 60:
-            tags.append("deep-work")
-        
-        return tags
+        return build_tags(
+            message.activity_type.value, analysis.work_type.value, message.channel_name,
+            analysis.urgency_score, analysis.complexity, analysis.estimated_time_minutes
+        )
     
-    def generate_todo_list(self, analyzed_messages: List[tuple[SlackMessage, AIAnalysis, PriorityScore]],
+    def generate_todo_list(self, messages: List[SlackMessage], analyses: List[AIAnalysis],
+                          priorities: List[PriorityScore],
                           title: str = None) -> TodoList:
-        """Generate complete todo list from analyzed messages"""
-        
-        # Generate todos
-        todos = []
-        models_used = set()
+        """Generate complete todo list from analyzed messages
+        
+        `messages`, `analyses` and `priorities` are parallel lists.
+        """
+        
+        # Generate todos, all stamped with the same time; ids for every todo
+        # plus the list come from one random draw
+        now = datetime.now()
+        ids = uuid4_ids(len(messages) + 1)
+        todos = [
+            self.generate_todo_item(message, analysis, priority, now, next(ids))
+            for message, analysis, priority in zip(messages, analyses, priorities, strict=True)
+            if analysis.action_required  # Only create todos for actionable items
+        ]
+        return self.assemble_todo_list(todos, len(messages), title, now, next(ids))
+    
+    def assemble_todo_list(self, todos: List[TodoItem], analyzed_count: int,
+                           title: str = None, now: Optional[datetime] = None,
+                           list_id: Optional[str] = None) -> TodoList:
+        """Sort already-generated todos into a TodoList (see `generate_todo_list`)"""
+        now = now or datetime.now()
         
-        for message, analysis, priority in analyzed_messages:
-            if analysis.action_required:  # Only create todos for actionable items
-                todo = self.generate_todo_item(message, analysis, priority)
-                todos.append(todo)
-                models_used.add(analysis.model_used)
+        # Distinct models in first-seen order, so the output is reproducible
+        models_used = list(dict.fromkeys(todo.ai_analysis.model_used for todo in todos))
         
         # Sort by priority score (highest first)
-        todos.sort(key=lambda t: t.priority_score.final_score, reverse=True)
+        todos.sort(key=attrgetter("priority_score.final_score"), reverse=True)
         
         # Generate list metadata
         if not title:
-            title = f"스마트 할일 목록 - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            title = f"스마트 할일 목록 - {now.strftime('%Y-%m-%d %H:%M')}"
         
-        todo_list = TodoList(
-            id=str(uuid.uuid4()),
+        # Trusted internal data, same as generate_todo_item
+        todo_list = TodoList.model_construct(
+            id=list_id or str(uuid.uuid4()),
             title=title,
-            description=f"{len(analyzed_messages)}개 메시지 분석 결과",
+            description=f"{analyzed_count}개 메시지 분석 결과",
             items=todos,
+            created_at=now,
+            updated_at=now,
             total_items=len(todos),
             completed_items=0,
-            ai_models_used=list(models_used)
+            source_hours_scanned=24,
+            ai_models_used=models_used
         )
         
         return todo_list
@@ -172,23 +258,121 @@ class MorganOrchestrator:
     """Main orchestrator that coordinates all components"""
     
     def __init__(self):
-        self.slack_client = SlackClient()
-        self.ai_engine = AIEngine()
-        self.priority_calculator = PriorityCalculator()
+        # Backends are imported and built on first use, so commands like
+        # `feedback` never load the Slack/AI SDKs
+        self._slack_client: Optional["SlackClient"] = None
+        self._ai_engine: Optional["AIEngine"] = None
+        self._priority_calculator: Optional["PriorityCalculator"] = None
         self.todo_generator = TodoGenerator()
         
         # User patterns for learning (would be loaded from database)
         self.user_patterns: List[UserPattern] = []
+        
+        # Set when the last pipeline run failed (its result is a placeholder)
+        self.last_error: Optional[Exception] = None
+    
+    @property
+    def slack_client(self) -> "SlackClient":
+        if self._slack_client is None:
+            from slack_client import SlackClient
+            self._slack_client = SlackClient()
+        return self._slack_client
+    
+    @property
+    def ai_engine(self) -> "AIEngine":
+        if self._ai_engine is None:
+            from ai_engine import AIEngine
+            self._ai_engine = AIEngine()
+        return self._ai_engine
+    
+    @property
+    def priority_calculator(self) -> "PriorityCalculator":
+        if self._priority_calculator is None:
+            from priority_engine import PriorityCalculator
+            self._priority_calculator = PriorityCalculator()
+        return self._priority_calculator
+    
+    async def close(self) -> None:
+        """Release network resources held by the components"""
+        if self._ai_engine is not None:
+            await self._ai_engine.close()
     
     async def process_slack_activities(self, hours: int = 24, 
-                                      max_messages: int = 100) -> TodoList:
-        """Main processing pipeline"""
+                                      max_messages: int = 100,
+                                      on_progress: Optional[Callable[[int, int], None]] = None,
+                                      use_claude_batch: bool = False) -> TodoList:
+        """Main processing pipeline
+        
+        `on_progress(done, total)` is called as each message finishes analysis
+        (`total` grows while Slack activities are still being collected).
+        `use_claude_batch` sends Claude-tier messages through the Message
+        Batches API (see `AIEngine.analyze_batch`).
+        """
         print("🚀 Morgan이 슬랙 활동을 분석하고 있습니다...")
+        self.last_error = None
         
         try:
-            # Step 1: Collect Slack activities
+            # Steps 1-4 overlap: each batch of Slack activities goes to AI analysis
+            # as soon as it is collected, and each message is scored and turned into
+            # a todo as soon as its analysis arrives (non-actionable ones skip scoring)
             print("\n📱 1단계: Slack 활동 수집")
-            activities = await self.slack_client.collect_all_activities(hours)
+            print("🤖 2단계: AI 분석 (수집되는 대로 진행)")
+            print(f"🎯 3단계: 우선순위 계산 (분석이 끝나는 대로 진행)")
+            print(f"📋 4단계: 할일 목록 생성")
+            activities: List[SlackMessage] = []
+            results: asyncio.Queue = asyncio.Queue()
+            
+            async def analyze(batch: List[SlackMessage]) -> None:
+                await warmup
+                async for result in self.ai_engine.analyze_batch(batch, use_claude_batch):
+                    results.put_nowait(result)
+            
+            async def collect() -> None:
+                try:
+                    async with asyncio.TaskGroup() as analyses:
+                        async with aclosing(self.slack_client.stream_activities(hours)) as batches:
+                            async for batch in batches:
+                                # Limit number of messages to process
+                                room = max_messages - len(activities)
+                                if len(batch) > room:
+                                    print(f"⚠️ 메시지가 많아 최근 {max_messages}개만 처리합니다.")
+                                    batch = batch[:room]
+                                activities.extend(batch)
+                                analyses.create_task(analyze(batch))
+                                if len(activities) >= max_messages:
+                                    break
+                finally:
+                    results.put_nowait(None)
+            
+            # Warm the AI connection pools while Slack is being fetched
+            warmup = asyncio.create_task(self.ai_engine.warmup())
+            collecting = asyncio.create_task(collect())
+            now = datetime.now()
+            ids = uuid4_ids(max_messages + 1)
+            todos = []
+            analyzed_count = 0
+            try:
+                while (result := await results.get()) is not None:
+                    message, analysis = result
+                    analyzed_count += 1
+                    if analysis.action_required:
+                        priority = self.priority_calculator.calculate_priority(
+                            message, analysis, self.user_patterns, now
+                        )
+                        todos.append(self.todo_generator.generate_todo_item(
+                            message, analysis, priority, now, next(ids)
+                        ))
+                    if on_progress:
+                        on_progress(analyzed_count, len(activities))
+                try:
+                    await collecting
+                except ExceptionGroup as group:
+                    # Report the underlying failure, not the TaskGroup wrapper
+                    raise group.exceptions[0]
+                await warmup
+            finally:
+                collecting.cancel()
+                warmup.cancel()
             
             if not activities:
                 print("❌ 슬랙 활동을 찾을 수 없습니다.")
@@ -198,27 +382,9 @@ class MorganOrchestrator:
                     description="분석할 활동이 없습니다."
                 )
             
-            # Limit number of messages to process
-            if len(activities) > max_messages:
-                print(f"⚠️ 메시지가 많아 최근 {max_messages}개만 처리합니다.")
-                activities = activities[:max_messages]
-            
-            # Step 2: AI Analysis
-            print(f"\n🤖 2단계: AI 분석 ({len(activities)}개 메시지)")
-            analyzed_activities = await self.ai_engine.analyze_batch(activities)
-            
-            # Step 3: Priority Calculation
-            print(f"\n🎯 3단계: 우선순위 계산")
-            prioritized_activities = []
-            for message, analysis in analyzed_activities:
-                priority = self.priority_calculator.calculate_priority(
-                    message, analysis, self.user_patterns
-                )
-                prioritized_activities.append((message, analysis, priority))
-            
-            # Step 4: Todo Generation
-            print(f"\n📋 4단계: 할일 목록 생성")
-            todo_list = self.todo_generator.generate_todo_list(prioritized_activities)
+            todo_list = self.todo_generator.assemble_todo_list(
+                todos, analyzed_count, now=now, list_id=next(ids)
+            )
             
             # Step 5: Summary
             print(f"\n✅ 완료!")
@@ -228,15 +394,14 @@ class MorganOrchestrator:
             
             # Usage stats
             stats = self.ai_engine.get_usage_stats()
-            print(f"  - AI 호출: OpenAI {stats['openai_calls']}회, Claude {stats['claude_calls']}회")
+            print(f"  - AI 호출: OpenAI {stats['openai_calls']}회, Haiku {stats['haiku_calls']}회, Claude {stats['claude_calls']}회")
             print(f"  - 예상 비용: ${stats['estimated_cost_usd']}")
             
             return todo_list
             
         except Exception as e:
-            print(f"❌ 오류 발생: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("❌ 오류 발생: %s", e)
+            self.last_error = e
             
             # Return empty todo list
             return TodoList(
@@ -246,14 +411,15 @@ class MorganOrchestrator:
             )
     
     def collect_feedback(self, todo_id: str, satisfaction: int, 
-                        feedback_text: str = None, actual_priority: Priority = None) -> LearningFeedback:
+                        feedback_text: str = None, actual_priority: Priority = None,
+                        predicted_priority: Priority = Priority.MEDIUM) -> LearningFeedback:
         """Collect user feedback for learning"""
         # Find the todo item (in real implementation, this would query database)
         # For now, create feedback object
         
         feedback = LearningFeedback(
             todo_id=todo_id,
-            predicted_priority=Priority.MEDIUM,  # Would get from actual todo
+            predicted_priority=predicted_priority,
             actual_priority=actual_priority,
             user_satisfaction=satisfaction,
             feedback_text=feedback_text
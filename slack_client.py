@@ -5,52 +5,200 @@ Handles all interactions with the Slack API for collecting activities.
 """
 
 import asyncio
+import json
+import logging
 import os
+import sys
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Awaitable, Iterable, Tuple
 
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
 
 from models import SlackMessage, ActivityType
 
+log = logging.getLogger("morgan.slack")
+
+# Page sizes for the bulk lookups that prime the user/channel caches
+USERS_PAGE_SIZE = 200
+CONVERSATIONS_PAGE_SIZE = 1000
+
+# User/channel names carried over between runs; each entry, and the bulk
+# listing that primed them, is refreshed once older than the TTL
+CACHE_PATH = Path.home() / ".morgan" / "slack_cache.json"
+CACHE_TTL_HOURS = 24
+
+# Concurrent Slack API calls per client (the per-channel fan-out stays
+# well under Slack's per-method rate limits)
+SLACK_MAX_CONCURRENT = 8
+
+# Permalink host until auth.test reports the workspace URL (redirects to it)
+DEFAULT_WORKSPACE_URL = "https://slack.com/"
+
+# Channels listed and messages read per channel by the history prefetch
+# shared by thread replies and channel activities (each reads a prefix)
+HISTORY_CHANNELS = 50
+HISTORY_MESSAGES = 100
+
 
 class SlackClient:
     """Slack API client for collecting user activities"""
     
-    def __init__(self, token: Optional[str] = None):
-        """Initialize Slack client"""
+    def __init__(self, token: Optional[str] = None, cache_path: Optional[Path] = CACHE_PATH):
+        """Initialize Slack client (`cache_path=None` disables the on-disk cache)"""
         self.token = token or os.getenv("SLACK_TOKEN")
         if not self.token:
             raise ValueError("Slack token is required. Set SLACK_TOKEN environment variable.")
         
-        self.client = WebClient(token=self.token)
+        self.client = AsyncWebClient(token=self.token)
+        self._semaphore = asyncio.Semaphore(SLACK_MAX_CONCURRENT)
         self.user_id: Optional[str] = None
+        self.workspace_url = DEFAULT_WORKSPACE_URL
         self._user_info_cache: Dict[str, Any] = {}
         self._channel_info_cache: Dict[str, Any] = {}
+        self.cache_path = cache_path
+        # When each user/channel entry was fetched from the API (entries whose
+        # lookup failed have none, so their placeholders are never persisted)
+        self._fetched_at: Dict[str, float] = {}
+        self._primed_at: Optional[float] = None
+        self._cache_dirty = False
+        # Channel histories prefetched for the running collect_all_activities
+        self._history_cache: Optional[asyncio.Task] = None
     
     async def initialize(self) -> None:
         """Initialize client and get user info"""
         try:
             # Get current user info
-            response = self.client.auth_test()
+            response = await self.client.auth_test()
             self.user_id = response["user_id"]
-            print(f"✅ Authenticated as user {self.user_id}")
+            self.workspace_url = response.get("url") or DEFAULT_WORKSPACE_URL
+            log.info("✅ Authenticated as user %s", self.user_id)
         except SlackApiError as e:
             raise Exception(f"Failed to authenticate with Slack: {e.response['error']}")
+        
+        if not self._load_cache():
+            await self._prime_caches()
+    
+    def _load_cache(self) -> bool:
+        """Fill the caches with this user's saved entries still within the TTL
+        
+        Returns whether the bulk listing they came from is itself still fresh.
+        """
+        if self.cache_path is None:
+            return False
+        try:
+            cached = json.loads(self.cache_path.read_bytes())
+        except (OSError, ValueError):
+            return False
+        if cached.get("user_id") != self.user_id:
+            return False
+        
+        cutoff = time.time() - CACHE_TTL_HOURS * 3600
+        for key, cache in (("users", self._user_info_cache), ("channels", self._channel_info_cache)):
+            for entry_id, entry in cached.get(key, {}).items():
+                fetched_at = entry.pop("ts", 0)
+                if fetched_at >= cutoff:
+                    cache[entry_id] = entry
+                    self._fetched_at[entry_id] = fetched_at
+        self._primed_at = cached.get("primed_at")
+        return self._primed_at is not None and self._primed_at >= cutoff
+    
+    def save_cache(self) -> None:
+        """Persist user/channel names (only the fields messages use)
+        
+        Skipped when nothing new was fetched, so entries keep their own age.
+        """
+        if self.cache_path is None or not self._cache_dirty:
+            return
+        fetched_at = self._fetched_at
+        cached = {
+            "user_id": self.user_id,
+            "primed_at": self._primed_at,
+            "users": {
+                user_id: {
+                    **{key: user[key] for key in ("name", "real_name") if key in user},
+                    "ts": fetched_at[user_id],
+                }
+                for user_id, user in self._user_info_cache.items()
+                if user_id in fetched_at
+            },
+            "channels": {
+                channel_id: {
+                    "id": channel_id,
+                    "name": channel.get("name", "unknown"),
+                    "ts": fetched_at[channel_id],
+                }
+                for channel_id, channel in self._channel_info_cache.items()
+                if channel_id in fetched_at
+            },
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_path.write_text(json.dumps(cached, ensure_ascii=False), encoding="utf-8")
+            self._cache_dirty = False
+        except OSError as e:
+            log.warning("⚠️ Could not save Slack cache: %s", e)
+    
+    def _remember(self, cache: Dict[str, Any], entry_id: str, entry: Dict[str, Any],
+                  fetched_at: float) -> None:
+        """Cache an entry fetched from the API, to be persisted with its age"""
+        cache[entry_id] = entry
+        self._fetched_at[entry_id] = fetched_at
+        self._cache_dirty = True
+    
+    async def _call(self, method: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        """Call a Slack API method, capped at SLACK_MAX_CONCURRENT in flight"""
+        async with self._semaphore:
+            return await method(**kwargs)
+    
+    async def _paginate(self, method: Callable[..., Awaitable[Any]], key: str,
+                        **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every item under `key` across all cursor pages of a list method"""
+        cursor = None
+        while True:
+            if cursor:
+                kwargs["cursor"] = cursor
+            response = await self._call(method, **kwargs)
+            for item in response.get(key, []):
+                yield item
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return
+    
+    async def _prime_caches(self) -> None:
+        """Fill the user/channel caches with bulk list calls
+        
+        A few paged users.list/conversations.list calls replace one
+        users.info/conversations.info round trip per unseen id; single-id
+        lookups remain the fallback for anything not listed.
+        """
+        now = time.time()
+        try:
+            async for user in self._paginate(self.client.users_list, "members", limit=USERS_PAGE_SIZE):
+                self._remember(self._user_info_cache, user["id"], user, now)
+            async for channel in self._paginate(
+                self.client.conversations_list, "channels",
+                types="public_channel,private_channel,im,mpim", limit=CONVERSATIONS_PAGE_SIZE
+            ):
+                self._remember(self._channel_info_cache, channel["id"], channel, now)
+            self._primed_at = now
+        except SlackApiError as e:
+            log.warning("⚠️ Could not prefetch users/channels: %s", e.response["error"])
     
     def _get_timestamp_filter(self, hours: int) -> float:
         """Get timestamp for filtering messages"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         return cutoff_time.timestamp()
     
-    def _parse_slack_message(self, message_data: Dict[str, Any], 
-                           channel_info: Dict[str, Any],
-                           activity_type: ActivityType) -> SlackMessage:
+    async def _parse_slack_message(self, message_data: Dict[str, Any], 
+                                 channel_info: Dict[str, Any],
+                                 activity_type: ActivityType) -> SlackMessage:
         """Parse Slack API message data into SlackMessage model"""
         
         # Get user info
-        user_info = self._get_user_info(message_data.get("user", ""))
+        user_info = await self._get_user_info(message_data.get("user", ""))
         
         # Parse timestamp
         timestamp = datetime.fromtimestamp(float(message_data.get("ts", 0)))
@@ -59,15 +207,16 @@ class SlackClient:
         text = message_data.get("text", "")
         mentions_me = f"<@{self.user_id}>" in text if self.user_id else False
         
-        # Create permalink
-        permalink = f"https://{self.client.token[:10]}.slack.com/archives/{channel_info['id']}/p{message_data.get('ts', '').replace('.', '')}"
+        # Create permalink (Slack's format: workspace URL, channel, ts without the dot)
+        permalink = f"{self.workspace_url}archives/{channel_info['id']}/p{message_data.get('ts', '').replace('.', '')}"
         
         return SlackMessage(
             message_id=message_data.get("ts", ""),
             channel_id=channel_info["id"],
-            channel_name=channel_info.get("name", "unknown"),
+            # Few distinct channels/users across many messages: intern them
+            channel_name=sys.intern(channel_info.get("name", "unknown")),
             user_id=message_data.get("user", ""),
-            username=user_info.get("real_name", user_info.get("name", "unknown")),
+            username=sys.intern(user_info.get("real_name", user_info.get("name", "unknown"))),
             text=text,
             timestamp=timestamp,
             permalink=permalink,
@@ -77,26 +226,95 @@ class SlackClient:
             mentions_me=mentions_me
         )
     
-    def _get_user_info(self, user_id: str) -> Dict[str, Any]:
+    async def _get_user_info(self, user_id: str) -> Dict[str, Any]:
         """Get cached user info"""
         if user_id not in self._user_info_cache:
             try:
-                response = self.client.users_info(user=user_id)
-                self._user_info_cache[user_id] = response["user"]
+                response = await self._call(self.client.users_info, user=user_id)
+                self._remember(self._user_info_cache, user_id, response["user"], time.time())
             except SlackApiError:
                 self._user_info_cache[user_id] = {"name": "unknown", "real_name": "Unknown User"}
         return self._user_info_cache[user_id]
     
-    def _get_channel_info(self, channel_id: str) -> Dict[str, Any]:
+    async def _get_channel_info(self, channel_id: str) -> Dict[str, Any]:
         """Get cached channel info"""
         if channel_id not in self._channel_info_cache:
             try:
-                response = self.client.conversations_info(channel=channel_id)
-                self._channel_info_cache[channel_id] = response["channel"]
+                response = await self._call(self.client.conversations_info, channel=channel_id)
+                self._remember(self._channel_info_cache, channel_id, response["channel"], time.time())
             except SlackApiError:
                 self._channel_info_cache[channel_id] = {"id": channel_id, "name": "unknown"}
         return self._channel_info_cache[channel_id]
     
+    async def _gather(self, calls: Iterable[Awaitable[Any]]) -> List[Any]:
+        """Run API calls concurrently, keeping their order
+        
+        A call that failed with SlackApiError yields that error in its place
+        (so one bad channel doesn't sink the rest); other errors propagate.
+        """
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, SlackApiError):
+                raise result
+        return results
+    
+    async def _histories(self, channels: List[Dict[str, Any]], oldest: float,
+                         limit: int) -> List[Any]:
+        """Fetch recent history of every channel concurrently (see `_gather`)"""
+        return await self._gather(
+            self._call(self.client.conversations_history,
+                       channel=channel["id"], oldest=oldest, limit=limit)
+            for channel in channels
+        )
+    
+    async def _prefetch_history(self, oldest: float) -> Tuple[List[Dict[str, Any]], Dict[str, List[Any]]]:
+        """List channels and fetch each one's recent history once
+        
+        Returns the channels and their messages by channel id (channels whose
+        history failed are left out).
+        """
+        response = await self._call(
+            self.client.conversations_list,
+            types="public_channel,private_channel",
+            limit=HISTORY_CHANNELS
+        )
+        channels = response.get("channels", [])
+        histories = await self._histories(channels, oldest, limit=HISTORY_MESSAGES)
+        return channels, {
+            channel["id"]: history_response.get("messages", [])
+            for channel, history_response in zip(channels, histories)
+            if not isinstance(history_response, SlackApiError)
+        }
+    
+    async def _recent_history(self, oldest: float, channel_limit: int,
+                              message_limit: int) -> List[Tuple[Dict[str, Any], List[Any]]]:
+        """Recent messages of the first `channel_limit` channels
+        
+        Served from the prefetch when one is running and covers the limits,
+        otherwise fetched directly.
+        """
+        if (self._history_cache is not None and
+                channel_limit <= HISTORY_CHANNELS and message_limit <= HISTORY_MESSAGES):
+            channels, history = await self._history_cache
+            channels = channels[:channel_limit]
+        else:
+            response = await self._call(
+                self.client.conversations_list,
+                types="public_channel,private_channel",
+                limit=channel_limit
+            )
+            channels = response.get("channels", [])
+            histories = await self._histories(channels, oldest, limit=message_limit)
+            history = {
+                channel["id"]: history_response.get("messages", [])
+                for channel, history_response in zip(channels, histories)
+                if not isinstance(history_response, SlackApiError)
+            }
+        return [
+            (channel, history[channel["id"]][:message_limit])
+            for channel in channels if channel["id"] in history
+        ]
+    
     async def fetch_mentions(self, hours: int = 24) -> List[SlackMessage]:
         """Fetch messages where user is mentioned"""
         if not self.user_id:
@@ -108,7 +326,8 @@ class SlackClient:
         try:
             # Search for mentions
             query = f"<@{self.user_id}>"
-            response = self.client.search_messages(
+            response = await self._call(
+                self.client.search_messages,
                 query=query,
                 sort="timestamp",
                 sort_dir="desc"
@@ -119,17 +338,17 @@ class SlackClient:
                 if float(message.get("ts", 0)) < oldest:
                     continue
                 
-                channel_info = self._get_channel_info(message.get("channel", {}).get("id", ""))
-                slack_message = self._parse_slack_message(
+                channel_info = await self._get_channel_info(message.get("channel", {}).get("id", ""))
+                slack_message = await self._parse_slack_message(
                     message, channel_info, ActivityType.MENTION
                 )
                 messages.append(slack_message)
             
-            print(f"📍 Found {len(messages)} mentions")
+            log.info("📍 Found %d mentions", len(messages))
             return messages
             
         except SlackApiError as e:
-            print(f"❌ Error fetching mentions: {e.response['error']}")
+            log.error("❌ Error fetching mentions: %s", e.response["error"])
             return []
     
     async def fetch_direct_messages(self, hours: int = 24) -> List[SlackMessage]:
@@ -139,36 +358,31 @@ class SlackClient:
         
         try:
             # Get DM conversations
-            response = self.client.conversations_list(types="im")
+            response = await self._call(self.client.conversations_list, types="im")
             dm_channels = response.get("channels", [])
             
-            for channel in dm_channels:
-                try:
-                    # Get messages from this DM
-                    history_response = self.client.conversations_history(
-                        channel=channel["id"],
-                        oldest=oldest,
-                        limit=100
-                    )
-                    
-                    for message in history_response.get("messages", []):
-                        # Skip own messages and bot messages
-                        if message.get("user") == self.user_id or message.get("bot_id"):
-                            continue
-                        
-                        slack_message = self._parse_slack_message(
-                            message, channel, ActivityType.DM
-                        )
-                        messages.append(slack_message)
-                        
-                except SlackApiError:
+            # Get messages from every DM at once
+            histories = await self._histories(dm_channels, oldest, limit=100)
+            
+            for channel, history_response in zip(dm_channels, histories):
+                if isinstance(history_response, SlackApiError):
                     continue
+                
+                for message in history_response.get("messages", []):
+                    # Skip own messages and bot messages
+                    if message.get("user") == self.user_id or message.get("bot_id"):
+                        continue
+                    
+                    slack_message = await self._parse_slack_message(
+                        message, channel, ActivityType.DM
+                    )
+                    messages.append(slack_message)
             
-            print(f"💬 Found {len(messages)} DMs")
+            log.info("💬 Found %d DMs", len(messages))
             return messages
             
         except SlackApiError as e:
-            print(f"❌ Error fetching DMs: {e.response['error']}")
+            log.error("❌ Error fetching DMs: %s", e.response["error"])
             return []
     
     async def fetch_thread_replies(self, hours: int = 24) -> List[SlackMessage]:
@@ -179,57 +393,63 @@ class SlackClient:
         try:
             # This is more complex - we need to find threads user participated in
             # For now, implement a simplified version that checks recent channels
+            histories = await self._recent_history(oldest, channel_limit=50, message_limit=100)
             
-            response = self.client.conversations_list(
-                types="public_channel,private_channel",
-                limit=50
+            # Thread replies by others, plus the threads (channel id, thread ts)
+            # the user is known to be in, or known not to be in, from the history
+            candidates = []
+            my_threads = set()
+            settled_threads = set()
+            for channel, history in histories:
+                for message in history:
+                    thread = (channel["id"], message.get("thread_ts") or message.get("ts"))
+                    if message.get("user") == self.user_id:
+                        my_threads.add(thread)
+                    elif message.get("reply_count"):
+                        # Thread parents list who replied (reply_users may be truncated)
+                        reply_users = message.get("reply_users", [])
+                        if self.user_id in reply_users:
+                            my_threads.add(thread)
+                        elif message.get("reply_users_count", 0) <= len(reply_users):
+                            settled_threads.add(thread)
+                    
+                    # Check if this is a thread reply and user is involved
+                    if (message.get("thread_ts") and 
+                        message.get("user") != self.user_id and
+                        not message.get("bot_id")):
+                        candidates.append((channel, message, thread))
+            
+            # Only threads the history can't answer need conversations.replies,
+            # once per thread however many candidates it has
+            unknown_threads = list(dict.fromkeys(
+                thread for _, _, thread in candidates
+                if thread not in my_threads and thread not in settled_threads
+            ))
+            replies = await self._gather(
+                self._call(self.client.conversations_replies, channel=channel_id, ts=thread_ts)
+                for channel_id, thread_ts in unknown_threads
             )
+            for thread, replies_response in zip(unknown_threads, replies):
+                if isinstance(replies_response, SlackApiError):
+                    continue
+                
+                # Check if user has any messages in this thread
+                if any(reply.get("user") == self.user_id
+                       for reply in replies_response.get("messages", [])):
+                    my_threads.add(thread)
             
-            for channel in response.get("channels", []):
-                try:
-                    # Get recent messages
-                    history_response = self.client.conversations_history(
-                        channel=channel["id"],
-                        oldest=oldest,
-                        limit=100
+            for channel, message, thread in candidates:
+                if thread in my_threads:
+                    slack_message = await self._parse_slack_message(
+                        message, channel, ActivityType.THREAD_REPLY
                     )
-                    
-                    for message in history_response.get("messages", []):
-                        # Check if this is a thread reply and user is involved
-                        if (message.get("thread_ts") and 
-                            message.get("user") != self.user_id and
-                            not message.get("bot_id")):
-                            
-                            # Check if user participated in thread
-                            try:
-                                replies_response = self.client.conversations_replies(
-                                    channel=channel["id"],
-                                    ts=message.get("thread_ts")
-                                )
-                                
-                                # Check if user has any messages in this thread
-                                user_in_thread = any(
-                                    reply.get("user") == self.user_id 
-                                    for reply in replies_response.get("messages", [])
-                                )
-                                
-                                if user_in_thread:
-                                    slack_message = self._parse_slack_message(
-                                        message, channel, ActivityType.THREAD_REPLY
-                                    )
-                                    messages.append(slack_message)
-                                    
-                            except SlackApiError:
-                                continue
-                                
-                except SlackApiError:
-                    continue
+                    messages.append(slack_message)
             
-            print(f"🧵 Found {len(messages)} thread replies")
+            log.info("🧵 Found %d thread replies", len(messages))
             return messages
             
         except SlackApiError as e:
-            print(f"❌ Error fetching thread replies: {e.response['error']}")
+            log.error("❌ Error fetching thread replies: %s", e.response["error"])
             return []
     
     async def fetch_channel_activities(self, hours: int = 24, limit_channels: int = 20) -> List[SlackMessage]:
@@ -238,85 +458,103 @@ class SlackClient:
         oldest = self._get_timestamp_filter(hours)
         
         try:
-            # Get channels user is member of
-            response = self.client.conversations_list(
-                types="public_channel,private_channel",
-                limit=limit_channels
-            )
+            # Get recent messages from the channels user is member of
+            histories = await self._recent_history(oldest, channel_limit=limit_channels, message_limit=50)
             
-            for channel in response.get("channels", []):
-                try:
-                    # Get recent messages
-                    history_response = self.client.conversations_history(
-                        channel=channel["id"],
-                        oldest=oldest,
-                        limit=50
-                    )
+            for channel, history in histories:
+                for message in history:
+                    # Skip own messages, bot messages, and already processed mentions
+                    if (message.get("user") == self.user_id or 
+                        message.get("bot_id") or
+                        f"<@{self.user_id}>" in message.get("text", "")):
+                        continue
                     
-                    for message in history_response.get("messages", []):
-                        # Skip own messages, bot messages, and already processed mentions
-                        if (message.get("user") == self.user_id or 
-                            message.get("bot_id") or
-                            f"<@{self.user_id}>" in message.get("text", "")):
-                            continue
-                        
-                        slack_message = self._parse_slack_message(
-                            message, channel, ActivityType.CHANNEL_MESSAGE
-                        )
-                        messages.append(slack_message)
-                        
-                except SlackApiError:
-                    continue
+                    slack_message = await self._parse_slack_message(
+                        message, channel, ActivityType.CHANNEL_MESSAGE
+                    )
+                    messages.append(slack_message)
             
-            print(f"📢 Found {len(messages)} channel activities")
+            log.info("📢 Found %d channel activities", len(messages))
             return messages
             
         except SlackApiError as e:
-            print(f"❌ Error fetching channel activities: {e.response['error']}")
+            log.error("❌ Error fetching channel activities: %s", e.response["error"])
             return []
     
-    async def collect_all_activities(self, hours: int = 24) -> List[SlackMessage]:
-        """Collect all types of activities"""
-        print(f"🔍 Collecting Slack activities from last {hours} hours...")
+    async def stream_activities(self, hours: int = 24) -> AsyncIterator[List[SlackMessage]]:
+        """Collect all types of activities, yielding one batch per fetch
+        
+        All fetches run concurrently; each batch is released as soon as its
+        fetch and the ones before it (mentions, DMs, thread replies, channel
+        activities) are done, so a message seen by several fetches keeps the
+        earlier type. Batches only hold messages not yielded before.
+        """
+        log.info("🔍 Collecting Slack activities from last %d hours...", hours)
         
         # Initialize if needed
         if not self.user_id:
             await self.initialize()
         
-        # Collect all activity types in parallel
-        activities = []
-        
-        try:
-            # Run all fetching operations concurrently
-            results = await asyncio.gather(
+        # Thread replies and channel activities read the same channel
+        # histories; fetch them once for both
+        self._history_cache = asyncio.create_task(
+            self._prefetch_history(self._get_timestamp_filter(hours))
+        )
+        fetches = [
+            asyncio.create_task(fetch)
+            for fetch in (
                 self.fetch_mentions(hours),
                 self.fetch_direct_messages(hours),
                 self.fetch_thread_replies(hours),
                 self.fetch_channel_activities(hours),
-                return_exceptions=True
             )
-            
-            # Combine results
-            for result in results:
-                if isinstance(result, list):
-                    activities.extend(result)
-                elif isinstance(result, Exception):
-                    print(f"⚠️ Warning: {result}")
-            
-            # Remove duplicates based on message_id and channel_id
+        ]
+        
+        try:
+            # Remove duplicates based on message_id and channel_id (a ts is only
+            # unique within its channel); first occurrence wins, order kept
             seen = set()
-            unique_activities = []
-            for activity in activities:
-                key = (activity.message_id, activity.channel_id)
-                if key not in seen:
-                    seen.add(key)
-                    unique_activities.append(activity)
+            for fetch in fetches:
+                try:
+                    result = await fetch
+                except Exception as e:
+                    log.warning("⚠️ Warning: %s", e, exc_info=True)
+                    continue
+                
+                batch = []
+                for activity in result:
+                    key = (activity.message_id, activity.channel_id)
+                    if key not in seen:
+                        seen.add(key)
+                        batch.append(activity)
+                if batch:
+                    yield batch
             
-            print(f"✅ Collected {len(unique_activities)} unique activities")
-            return unique_activities
+            log.info("✅ Collected %d unique activities", len(seen))
+        finally:
+            # The consumer may stop early; don't leave fetches running
+            for fetch in fetches:
+                fetch.cancel()
+            self._history_cache.cancel()
+            self._history_cache = None
+            # Names resolved so far are kept even when the consumer stops early
+            self.save_cache()
+    
+    async def collect_all_activities(self, hours: int = 24) -> List[SlackMessage]:
+        """Collect all types of activities (see `stream_activities`)"""
+        # Initialize if needed
+        if not self.user_id:
+            await self.initialize()
+        
+        activities = []
+        
+        try:
+            async for batch in self.stream_activities(hours):
+                activities.extend(batch)
+            return activities
             
         except Exception as e:
-            print(f"❌ Error collecting activities: {e}")
+            log.exception("❌ Error collecting activities: %s", e)
             return []
 
 